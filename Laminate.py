@@ -2,6 +2,13 @@ from typing import List, Dict, Optional
 import numpy as np
 import Plies
 
+# prozessweiter Cache: Lagenaufbau -> (A, B, D, ABD, Dicke)
+_abd_cache = {}
+
+
+def clear_abd_cache() -> None:
+    _abd_cache.clear()
+
 
 class Laminate:
     def __init__(self, entries: List[Plies.Ply]):
@@ -10,9 +17,10 @@ class Laminate:
         self.Aij = np.zeros((3, 3))
         self.Bij = np.zeros((3, 3))
         self.Dij = np.zeros((3, 3))
-        self.update_laminate_properties()
         self.ABDij = np.zeros((6, 6))
         self.thickness = 0
+        self._abd_key = None
+        self.update_laminate_properties()
 
     @classmethod
     def from_ply_list(cls, entry_list: List[Plies.Ply]):
@@ -34,9 +42,28 @@ class Laminate:
         else:
             raise ValueError("Invalid index")
 
+    def layup_key(self) -> tuple:
+        # aendert sich bei add_ply/remove_ply und bei jeder Aenderung von Dicke, Winkel oder Material einer Lage
+        return tuple((ply.thickness,) + Plies.qbar_key(ply.material, ply.rotation_angle) for ply in self.entries)
+
+    def invalidate(self):
+        self._abd_key = None
+
     def calc_ABD_matrices(self):
+        key = self.layup_key()
+        if key == self._abd_key:
+            return
+        cached = _abd_cache.get(key)
+        if cached is None:
+            cached = self._compute_ABD_matrices()
+            for matrix in cached[:4]:
+                matrix.flags.writeable = False
+            _abd_cache[key] = cached
+        self.Aij, self.Bij, self.Dij, self.ABDij, self.thickness = cached
+        self._abd_key = key
+
+    def _compute_ABD_matrices(self):
         total_thickness = sum(ply.thickness for ply in self.entries)
-        self.thickness = total_thickness
 
         z_bot = -total_thickness / 2.0
         z_coords = [z_bot]
@@ -62,16 +89,14 @@ class Laminate:
             B += 0.5 * Qbar * (z_k ** 2 - z_km1 ** 2)
             D += (1 / 3) * Qbar * (z_k ** 3 - z_km1 ** 3)
 
-        self.Aij = A
-        self.Bij = B
-        self.Dij = D
-
-        self.ABDij = np.block([
+        ABD = np.block([
             [A, B],
             [B, D]
         ])
+        return A, B, D, ABD, total_thickness
 
     def update_laminate_properties(self):
+        self.invalidate()
         self.calc_ABD_matrices()
 
     def print_layup(self):
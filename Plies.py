@@ -4,6 +4,22 @@ import numpy as np
 import helpers
 import Material
 
+# prozessweiter Cache der transformierten Steifigkeit, Schluessel siehe qbar_key
+_qbar_cache = {}
+
+
+def material_key(material: Material.PropertiesComposite) -> tuple:
+    # nur die Kennwerte, von denen Q und Qbar abhaengen
+    return material.E_1, material.E_2, material.G_31, material.v_31
+
+
+def qbar_key(material: Material.PropertiesComposite, rotation_angle: float) -> tuple:
+    return material_key(material) + (float(rotation_angle),)
+
+
+def clear_qbar_cache() -> None:
+    _qbar_cache.clear()
+
 
 @dataclass
 class Ply:
@@ -33,7 +49,13 @@ class Ply:
 
     def calc_global_stiffens_matrix(self):
         self.calc_local_stiffness_matrix()
-        self.global_stiffness_matrix = (
-                helpers.transform_stress_to_global(self.rotation_angle)
-                @ self.local_stiffness_matrix
-                @ helpers.transform_strains_to_local(self.rotation_angle))
\ No newline at end of file
+        key = qbar_key(self.material, self.rotation_angle)
+        Qbar = _qbar_cache.get(key)
+        if Qbar is None:
+            Qbar = (helpers.transform_stress_to_global(self.rotation_angle)
+                    @ self.local_stiffness_matrix
+                    @ helpers.transform_strains_to_local(self.rotation_angle))
+            # wird zwischen Lagen geteilt
+            Qbar.flags.writeable = False
+            _qbar_cache[key] = Qbar
+        self.global_stiffness_matrix = Qbar
\ No newline at end of file
@@ -1,8 +1,10 @@
 import sys
+import threading
+import traceback
 
 import matplotlib
 import numpy as np
-from PyQt5 import QtWidgets
+from PyQt5 import QtCore, QtWidgets
 from charset_normalizer.md import annotations
 from pyvistaqt import QtInteractor
 import pyvista as pv
@@ -13,6 +15,73 @@ import matplotlib
 # TODO: make add node button
 # TODO: make remove node and element. If node removed, remove all elemnts
 
+# Spalten von Structure.recover_strains: Membrandehnungen und Kruemmungen (keine Querschubverzerrungen)
+STRAIN_COMPONENTS = ["εx", "εy", "γxy", "κx", "κy", "κxy"]
+# Ergebnisauswahl: Name des Arrays im Grid -> 'cell' oder 'point'
+RESULT_ARRAYS = {**{name: 'cell' for name in STRAIN_COMPONENTS}, "|u|": 'point', "failure index": 'cell'}
+# Skalierung 100 % am Regler: groesste Verschiebung = 10 % der Modellgroesse
+AUTO_SCALE_FRACTION = 0.1
+ANIMATION_FRAMES = 30           # Bilder je Schwingung bzw. Durchlauf aller Lastfaelle
+ANIMATION_INTERVAL_MS = 33      # ~30 fps
+
+class SolveWorker(QtCore.QObject):
+    """Runs Structure.solve_stages() on a QThread.
+
+    until: last stage to run, 'assembly' also checks K for missing
+    constraints, None only evaluates failure_criterion on the current
+    solution. With failure_criterion the failure index is computed after the
+    strains and kept in failure_index. cancel() stops before the next stage;
+    the structure stays consistent and keeps the finished stages.
+    """
+    progress = QtCore.pyqtSignal(str, int, int)   # Stufe, Index, Anzahl
+    finished = QtCore.pyqtSignal()
+    cancelled = QtCore.pyqtSignal()
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, s: structure.Structure, until: str = 'strains', failure_criterion: str = None):
+        super().__init__()
+        self.structure = s
+        self.stages = s.SOLVE_STAGES[:s.SOLVE_STAGES.index(until) + 1] if until is not None else ()
+        self.failure_criterion = failure_criterion if until in ('strains', None) else None
+        self.failure_index = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        # aus dem GUI-Thread aufrufbar
+        self._cancel.set()
+
+    def run(self):
+        count = len(self.stages) + (self.failure_criterion is not None)
+        stages = self.structure.solve_stages() if self.stages else iter(())
+        try:
+            for k, stage in enumerate(stages):
+                if self._cancel.is_set():
+                    self.cancelled.emit()
+                    return
+                self.progress.emit(stage, k, count)
+                if stage == self.stages[-1]:
+                    next(stages, None)   # letzte gewuenschte Stufe noch ausfuehren
+                    break
+            if self.stages and self.stages[-1] == 'assembly':
+                self.structure.check_singularity()
+                self.structure.assemble_forces_matrix()
+            if self.failure_criterion is not None:
+                # Versagensauswertung je Lage ebenfalls hier, nicht im GUI-Thread
+                if self._cancel.is_set():
+                    self.cancelled.emit()
+                    return
+                self.progress.emit('failure', count - 1, count)
+                self.failure_index = self.structure.evaluate_failure(self.failure_criterion).failure_index
+        except Exception:
+            self.failed.emit(traceback.format_exc())
+            return
+        finally:
+            if self.stages:
+                stages.close()
+        self.progress.emit('done', count, count)
+        self.finished.emit()
+
+
 class StructureViewerWidget(QtWidgets.QWidget):
     # makes this class a Qt GUI component. Qt works with inheritance
     def __init__(self, s: structure.Structure):
@@ -27,6 +96,25 @@ class StructureViewerWidget(QtWidgets.QWidget):
             'forces': False
         }
 
+        # ein UnstructuredGrid fuer die ganze Struktur, Ergebnisse als Arrays darauf
+        self.grid = None
+        self.displaced_grid = None
+        self._mesh_actor = None
+        self._scalar_bar_title = None
+        self._lookup_table = pv.LookupTable(cmap="viridis")
+        self._solve_thread = None
+        self._solve_worker = None
+        self._solve_until = None
+        # Puffer der verformten Darstellung, werden pro Bild in place beschrieben
+        self._base_points = None
+        self._displaced_points = None
+        self._animation_timer = QtCore.QTimer(self)
+        self._animation_timer.setInterval(ANIMATION_INTERVAL_MS)
+        self._animation_timer.timeout.connect(self._next_frame)
+        self._frame = 0
+        self._frames = []
+        self._scale = 1.0
+
         self._build_ui()
         self._draw_elements()
         self.force_vector_magnitude = 0.001
@@ -74,79 +162,245 @@ class StructureViewerWidget(QtWidgets.QWidget):
         button_layout.addWidget(self.force_mag_field)
 
         self.strain_selector = QtWidgets.QComboBox()
-        self.strain_selector.addItems(["εx", "εy", "εxy", "γxz", "γyz"])
-        button_layout.addWidget(QtWidgets.QLabel("Strain Component"))
+        self.strain_selector.addItems(list(RESULT_ARRAYS))
+        self.strain_selector.currentIndexChanged.connect(self._show_selected_result)
+        button_layout.addWidget(QtWidgets.QLabel("Result"))
         button_layout.addWidget(self.strain_selector)
 
         self.btn_show_strain = QtWidgets.QPushButton("Show Strain")
         self.btn_show_strain.clicked.connect(self.show_strain)
         button_layout.addWidget(self.btn_show_strain)
 
+        progress_layout = QtWidgets.QHBoxLayout()
+        self.progress_label = QtWidgets.QLabel("")
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setVisible(False)
+        self.btn_cancel = QtWidgets.QPushButton("Cancel")
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self._cancel_solve)
+        progress_layout.addWidget(self.progress_label)
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.btn_cancel)
+
+        view_layout = QtWidgets.QHBoxLayout()
+        self.scale_slider = QtWidgets.QSlider(QtCore.Qt.Horizontal)
+        self.scale_slider.setRange(0, 500)   # Prozent der automatischen Skalierung
+        self.scale_slider.setValue(100)
+        self.scale_slider.valueChanged.connect(self._update_deformation_scale)
+        self.scale_label = QtWidgets.QLabel("Scale")
+        view_layout.addWidget(QtWidgets.QLabel("Deformation"))
+        view_layout.addWidget(self.scale_slider)
+        view_layout.addWidget(self.scale_label)
+
+        self.animation_selector = QtWidgets.QComboBox()
+        self.animation_selector.addItems(["Oscillate", "Load cases"])
+        self.animation_selector.currentIndexChanged.connect(self._update_deformation_scale)
+        view_layout.addWidget(self.animation_selector)
+        self.btn_animate = QtWidgets.QPushButton("Animate")
+        self.btn_animate.setCheckable(True)
+        self.btn_animate.toggled.connect(self._toggle_animation)
+        view_layout.addWidget(self.btn_animate)
+
         layout.addLayout(button_layout)
+        layout.addLayout(view_layout)
+        layout.addLayout(progress_layout)
         layout.addWidget(self.plotter.interactor)
 
         # conects the viewer
 
     def _solve_matrix(self):
-        self.structure.solve()
+        self._start_worker('strains')
+
+    def _start_worker(self, until: str):
+        # Assemblierung/Loesung im Hintergrund, die Oberflaeche bleibt bedienbar
+        if self._solve_thread is not None:
+            return
+        self._solve_until = until
+        self._solve_thread = QtCore.QThread(self)
+        # Versagensindex nur rechnen, wenn er angezeigt wird
+        criterion = 'tsai_wu' if self.strain_selector.currentText() == "failure index" else None
+        self._solve_worker = SolveWorker(self.structure, until, criterion)
+        self._solve_worker.moveToThread(self._solve_thread)
+        self._solve_thread.started.connect(self._solve_worker.run)
+        self._solve_worker.progress.connect(self._on_solve_progress)
+        self._solve_worker.finished.connect(self._on_solve_finished)
+        self._solve_worker.cancelled.connect(lambda: self._on_solve_stopped("Cancelled"))
+        self._solve_worker.failed.connect(self._on_solve_failed)
+        for signal in (self._solve_worker.finished, self._solve_worker.cancelled, self._solve_worker.failed):
+            signal.connect(self._solve_thread.quit)
+        self._solve_thread.finished.connect(self._solve_thread_finished)
+
+        self._set_busy(True)
+        self._solve_thread.start()
+
+    def _set_busy(self, busy: bool):
+        # Struktur darf waehrend des Loesens nicht veraendert werden
+        if busy:
+            self.btn_animate.setChecked(False)
+        # auch Ergebnis- und Verformungsauswahl, sie lesen Ergebnisse, die der Worker gerade schreibt
+        for widget in (self.btn_assemble_matrix, self.btn_solve_matrix, self.btn_show_displaced, self.btn_show_strain,
+                       self.btn_animate, self.strain_selector, self.scale_slider, self.animation_selector):
+            widget.setEnabled(not busy)
+        self.btn_cancel.setEnabled(busy)
+        self.progress_bar.setVisible(busy)
+
+    def _cancel_solve(self):
+        if self._solve_worker is not None:
+            self._solve_worker.cancel()
+            self.progress_label.setText("Cancelling...")
+
+    def _on_solve_progress(self, stage: str, index: int, count: int):
+        self.progress_bar.setRange(0, count)
+        self.progress_bar.setValue(index)
+        self.progress_label.setText(stage)
+
+    def _on_solve_finished(self):
+        # Ergebnisse in die vorhandenen Grids schreiben, keine neuen Actors
+        failure_index = self._solve_worker.failure_index
+        self._on_solve_stopped("Done")
+        if self._solve_until == 'assembly':
+            return
+        if self._solve_until == 'strains':
+            self._update_result_arrays()
+        if failure_index is not None:
+            self.grid.cell_data["failure index"] = failure_index
+        self._show_selected_result()
+        if self._solve_until == 'strains' and self.displaced_grid is not None:
+            self.show_displaced()
+
+    def _on_solve_failed(self, message: str):
+        # letzte Zeile (Fehlermeldung) im Fenster, Traceback in den Details
+        self._on_solve_stopped("Failed: " + message.strip().splitlines()[-1])
+        box = QtWidgets.QMessageBox(QtWidgets.QMessageBox.Critical, "Solve failed",
+                                    message.strip().splitlines()[-1], parent=self)
+        box.setDetailedText(message)
+        box.exec_()
+
+    def _on_solve_stopped(self, text: str):
+        self.progress_label.setText(text)
+        self._set_busy(False)
+
+    def closeEvent(self, event):
+        # laufende Stufe noch beenden lassen, dann den Thread abbauen
+        if self._solve_thread is not None:
+            self._solve_worker.cancel()
+            self._solve_thread.quit()
+            self._solve_thread.wait()
+        super().closeEvent(event)
+
+    def _solve_thread_finished(self):
+        self._solve_thread.deleteLater()
+        self._solve_worker.deleteLater()
+        self._solve_thread = None
+        self._solve_worker = None
 
     def show_displaced(self):
-        for element in self.structure.elements:
-            # collect node coordinates
-            points = np.array([n.displaced for n in element.nodes])
-
-            if len(points) == 3:  # triangular shell
-                faces = np.hstack([[3, 0, 1, 2]])
-            elif len(points) == 4:  # quad shell
-                faces = np.hstack([[4, 0, 1, 2, 3]])
-            else:
-                continue  # skip unsupported
-
-            mesh = pv.PolyData(points, faces)
-            self.plotter.add_mesh(mesh, color="lightgray", style="wireframe")  # or surface
-        self.plotter.show_axes()
-
-    def show_strain(self):
-        # Which strain component to display (0–4)
-        comp_idx = self.strain_selector.currentIndex()
-        print(comp_idx)
-
-        # Remove old strain meshes if any
-        self.plotter.clear()
-        self._draw_elements()  # redraw base geometry for context
-
-        # Collect strain values
-        for element in self.structure.elements:
-            points = np.array([n.node_position for n in element.nodes])
-            faces = np.hstack([[4, 0, 1, 2, 3]])
-
-            strain_value = element.get_strain()[comp_idx]
+        # verformte Struktur als zweites Grid mit derselben Topologie und eigenem Punktpuffer
+        if self.displaced_grid is None:
+            self.displaced_grid = self.grid.copy(deep=False)
+            self.displaced_grid.points = self.grid.points.copy()
+            self._base_points = self.grid.points
+            self._displaced_points = self.displaced_grid.points
+            self.plotter.add_mesh(self.displaced_grid, color="lightgray", style="wireframe", name="displaced")
+        self._update_deformation_scale()
+
+    def _animation_frames(self):
+        # Verschiebungsfelder (n_nodes, 3) als Views, ohne Kopie der Ergebnisarrays
+        if self.animation_selector.currentText() == "Load cases" and self.structure.load_case_displacements is not None:
+            return [u[:, :3] for u in self.structure.load_case_displacements]
+        return [self.structure.nodal_displacements()[:, :3]]
+
+    def _auto_scale(self, frames) -> float:
+        # Faktor, bei dem die groesste Verschiebung AUTO_SCALE_FRACTION der Modellgroesse ist
+        size = np.linalg.norm(np.ptp(self._base_points, axis=0))
+        u_max = max(np.abs(u).max() for u in frames)
+        return AUTO_SCALE_FRACTION * size / u_max if u_max > 0 else 1.0
+
+    def _set_displaced_points(self, u: np.ndarray, scale: float):
+        # points = coords + scale * u direkt im VTK-Puffer, kein neuer Actor
+        np.multiply(u, scale, out=self._displaced_points)
+        self._displaced_points += self._base_points
+        self.displaced_grid.GetPoints().Modified()
+        self.plotter.render()
 
-            mesh = pv.PolyData(points, faces)
-            mesh.cell_data["strain"] = [strain_value]  # assign strain as scalar
-            self.plotter.add_mesh(mesh, scalars="strain", cmap="viridis", show_edges=True)
+    def _update_deformation_scale(self, *args):
+        if self.displaced_grid is None:
+            return
+        self._frames = self._animation_frames()
+        self._scale = self._auto_scale(self._frames) * self.scale_slider.value() / 100.0
+        self.scale_label.setText(f"x{self._scale:.3g}")
+        if not self._animation_timer.isActive():
+            self._set_displaced_points(self._frames[0], self._scale)
+
+    def _toggle_animation(self, running: bool):
+        if running:
+            self.show_displaced()
+            self._frame = 0
+            self._animation_timer.start()
+        else:
+            self._animation_timer.stop()
+            self._update_deformation_scale()
+
+    def _next_frame(self):
+        # Schwingung: sin-Faktor auf dem aktuellen Feld; Lastfaelle: ein Lastfall je Bild
+        self._frame += 1
+        if len(self._frames) > 1:
+            step = self._frame * len(self._frames) // ANIMATION_FRAMES % len(self._frames)
+            self._set_displaced_points(self._frames[step], self._scale)
+        else:
+            factor = np.sin(2.0 * np.pi * self._frame / ANIMATION_FRAMES)
+            self._set_displaced_points(self._frames[0], self._scale * factor)
 
-        self.plotter.add_scalar_bar("Strain")
+    def show_strain(self):
+        # Ergebnisse neu an das Grid haengen und das gewaehlte Array anzeigen
+        self._update_result_arrays()
+        self._show_selected_result()
+
+    def _update_result_arrays(self):
+        # alle Elemente in einem Durchlauf (gecacht bis zur naechsten Loesung)
+        element_strains = self.structure.recover_strains('element')
+        for k, name in enumerate(STRAIN_COMPONENTS):
+            self.grid.cell_data[name] = element_strains[:, k]
+        u = self.structure.node_store.displacements[self.structure._node_index]
+        self.grid.point_data["|u|"] = np.linalg.norm(u[:, :3], axis=1)
+        # Versagensindex erst bei Auswahl neu berechnen (teure Auswertung je Lage)
+        if "failure index" in self.grid.cell_data:
+            self.grid.cell_data.remove("failure index")
+
+    def _show_selected_result(self, *args):
+        # nur die aktiven Skalare des einen Actors tauschen, nichts neu zeichnen
+        name = self.strain_selector.currentText()
+        if name == "failure index" and name not in self.grid.array_names and "|u|" in self.grid.array_names:
+            # im Worker nachrechnen, _on_solve_finished zeigt das Array dann an
+            self._start_worker(None)
+            return
+        if name not in self.grid.array_names:
+            return
+        mapper = self._mesh_actor.mapper
+        mapper.array_name = name
+        mapper.scalar_map_mode = RESULT_ARRAYS[name]
+        mapper.scalar_range = self.grid.get_data_range(name)
+        mapper.scalar_visibility = True
+
+        if self._scalar_bar_title is not None:
+            self.plotter.remove_scalar_bar(self._scalar_bar_title)
+        self.plotter.add_scalar_bar(name, mapper=mapper)
+        self._scalar_bar_title = name
         self.plotter.render()
 
     def _assemble_matrix(self):
-        self.structure.assemble_global_stiffness_matrix()
-        self.structure.assemble_forces_matrix()
+        self._start_worker('assembly')
 
     def _draw_elements(self):
-        for element in self.structure.elements:
-            # collect node coordinates
-            points = np.array([n.node_position for n in element.nodes])
-
-            if len(points) == 3:  # triangular shell
-                faces = np.hstack([[3, 0, 1, 2]])
-            elif len(points) == 4:  # quad shell
-                faces = np.hstack([[4, 0, 1, 2, 3]])
-            else:
-                continue  # skip unsupported
-
-            mesh = pv.PolyData(points, faces)
-            self.plotter.add_mesh(mesh, color="lightgray", style="wireframe")  # or surface
+        # ein Actor fuer alle Elemente, direkt aus Knoten- und Konnektivitaetsarrays
+        conn = self.structure.get_connectivity()
+        cells = np.hstack([np.full((conn.shape[0], 1), 4), conn]).ravel()
+        cell_types = np.full(conn.shape[0], pv.CellType.QUAD, dtype=np.uint8)
+        self.grid = pv.UnstructuredGrid(cells, cell_types, self.structure.node_coordinates())
+
+        self._mesh_actor = self.plotter.add_mesh(self.grid, color="lightgray", show_edges=True, name="structure")
+        self._mesh_actor.mapper.lookup_table = self._lookup_table
+        self._mesh_actor.mapper.scalar_visibility = False
         self.plotter.show_axes()
 
     def _update_force_mag(self, val):
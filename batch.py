@@ -0,0 +1,255 @@
+# Headless batch runner: model description (YAML) -> solve -> results file, without GUI or plotting imports
+import time
+
+_t_start = time.perf_counter()
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import yaml
+
+import constraints
+import forces
+import Laminate as lc
+import Material
+import mesh
+import mesh_io
+import results_io
+import Plies
+import solvers
+
+_t_imported = time.perf_counter()
+
+# Obergrenze fuer Import + Modellaufbau + Loesen + Schreiben eines trivialen Modells (--check-startup)
+STARTUP_BUDGET = 1.0
+GUI_MODULES = ('PyQt5', 'pyvista', 'vtk', 'vtkmodules', 'matplotlib')
+MATERIAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MaterialData')
+
+# kleinstes sinnvolles Modell, fuer --check-startup
+TRIVIAL_MODEL = {
+    'laminates': {'skin': [{'material': 'T300', 'thickness': 0.25e-3, 'angle': 0.0},
+                           {'material': 'T300', 'thickness': 0.25e-3, 'angle': 90.0}]},
+    'mesh': {'type': 'rectangular_plate', 'Lx': 1.0, 'Ly': 1.0, 'nx': 2, 'ny': 2},
+    'constraints': [{'nodes': 'all', 'free': [True, True, False, True, True]},
+                    {'nodes': 'x0', 'free': [False, False, False, False, False]}],
+    'forces': [{'nodes': 'x1', 'force': [1000.0, 0.0, 0.0, 0.0, 0.0]}],
+}
+
+_generators = {
+    'rectangular_plate': mesh.rectangular_plate,
+    'cylindrical_panel': mesh.cylindrical_panel,
+    'curved_panel': mesh.curved_panel,
+}
+
+
+def _load_material(name: str, materials: dict, base_dir: str) -> Material.PropertiesComposite:
+    # Pfad aus dem Abschnitt materials, sonst MaterialData/<name>.yaml neben dem Modell oder im Repository
+    path = materials.get(name)
+    candidates = [path] if path else [os.path.join(base_dir, 'MaterialData', name + '.yaml'),
+                                      os.path.join(MATERIAL_DIR, name + '.yaml')]
+    for candidate in candidates:
+        candidate = candidate if os.path.isabs(candidate) else os.path.join(base_dir, candidate)
+        if os.path.exists(candidate):
+            return Material.PropertiesComposite.from_yaml(candidate)
+    raise FileNotFoundError(f"Material '{name}' not found, tried {candidates}")
+
+
+def build_laminates(description: dict, base_dir: str) -> dict:
+    # laminates: {name: [{material, thickness [m], angle [deg]}, ...]}
+    materials = {}
+    material_paths = description.get('materials', {})
+    laminates = {}
+    for name, plies in description['laminates'].items():
+        entries = []
+        for ply in plies:
+            if ply['material'] not in materials:
+                materials[ply['material']] = _load_material(ply['material'], material_paths, base_dir)
+            entries.append(Plies.Ply(material=materials[ply['material']], thickness=float(ply['thickness']),
+                                     rotation_angle=np.deg2rad(float(ply.get('angle', 0.0)))))
+        laminates[name] = lc.Laminate(entries=entries)
+    return laminates
+
+
+def build_mesh(description: dict, base_dir: str = '.') -> mesh.Mesh:
+    # Generator (mesh: {type, ...}), Netzdatei (mesh: {file: *.msh | *.inp}) oder explizit nodes + elements
+    if 'mesh' in description and 'file' in description['mesh']:
+        path = description['mesh']['file']
+        m = mesh_io.read(path if os.path.isabs(path) else os.path.join(base_dir, path))
+    elif 'mesh' in description:
+        parameters = dict(description['mesh'])
+        generator = _generators[parameters.pop('type')]
+        m = generator(**parameters)
+    else:
+        m = mesh.Mesh(np.asarray(description['nodes'], dtype=float),
+                      np.asarray(description['elements'], dtype=np.int64))
+        m.node_sets['all'] = np.arange(m.n_nodes)
+    for name, ids in description.get('node_sets', {}).items():
+        m.node_sets[name] = np.asarray(ids, dtype=np.int64)
+    return m
+
+
+def build_model(description: dict, base_dir: str = '.'):
+    """Structure from a model description dict, see TRIVIAL_MODEL for the layout.
+
+    element_laminates (optional) gives a laminate name per element or maps
+    laminate names to element sets ({name: set}), otherwise the first
+    laminate is used everywhere. Node sets can also be defined as
+    selections: {name: {box: [[x0, y0, z0], [x1, y1, z1]]}} or
+    {name: {plane: {point: [...], normal: [...]}}}.
+    """
+    laminates = build_laminates(description, base_dir)
+    names = list(laminates)
+    m = build_mesh(description, base_dir)
+
+    laminate_index = None
+    element_laminates = description.get('element_laminates')
+    if isinstance(element_laminates, dict):
+        # Elementsets aus der Netzdatei; nicht zugeordnete Elemente bekommen das erste Laminat
+        laminate_index = np.zeros(m.n_elements, dtype=np.int64)
+        for name, element_set in element_laminates.items():
+            laminate_index[m.element_sets[element_set]] = names.index(name)
+    elif element_laminates is not None:
+        laminate_index = np.array([names.index(n) for n in element_laminates])
+    ref = np.asarray(description.get('reference_direction', [1.0, 0.0, 0.0]), dtype=float)
+    solver_options = dict(description.get('solver', {}))
+    s = mesh.build_structure(m, [laminates[n] for n in names] if laminate_index is not None else laminates[names[0]],
+                             ref, laminate_index=laminate_index, dof_ordering=solver_options.pop('dof_ordering', None))
+
+    solver_type = solver_options.pop('type', 'direct')
+    if solver_type == 'pcg':
+        s.set_solver(solvers.PCGSolver(**solver_options))
+    elif solver_type == 'direct':
+        s.set_solver(solvers.DirectSolver(**solver_options))
+        s.set_dof_ordering(s.dof_ordering)
+    else:
+        raise ValueError(f"Unknown solver type '{solver_type}', expected 'direct' or 'pcg'")
+
+    for name, selection in description.get('selections', {}).items():
+        if 'box' in selection:
+            s.add_node_set(name, s.select_box(*selection['box'], tol=selection.get('tol', 1e-9)))
+        else:
+            plane = selection['plane']
+            s.add_node_set(name, s.select_plane(plane['point'], plane['normal'], tol=selection.get('tol', 1e-9)))
+
+    for entry in description.get('constraints', []):
+        s.set_constraints(entry['nodes'], constraints.Constraint(*entry['free']))
+    for entry in description.get('forces', []):
+        s.set_forces(entry['nodes'], forces.Force(*entry['force']))
+
+    # load_cases: {name: [{nodes, force}, ...]}, Kraft je Knoten des Sets
+    nodes = s.get_unique_nodes()
+    for case, entries in description.get('load_cases', {}).items():
+        nodal_forces = {}
+        for entry in entries:
+            ids = s.node_sets[entry['nodes']] if isinstance(entry['nodes'], str) else entry['nodes']
+            for i in np.asarray(ids).tolist():
+                nodal_forces[nodes[i]] = nodal_forces.get(nodes[i], 0.0) + np.asarray(entry['force'], dtype=float)
+        s.add_load_case(case, nodal_forces)
+    return s
+
+
+def run(description: dict, output: str = None, base_dir: str = '.', failure_criterion: str = None,
+        verbose: bool = False, append: bool = False) -> dict:
+    # Modell aufbauen, loesen, Ergebnisse schreiben (.npz, .vtu/.pvd oder .xdmf); liefert die Zeiten je Schritt
+    timings = {'import': _t_imported - _t_start}
+    t = time.perf_counter()
+    s = build_model(description, base_dir)
+    timings['build'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    s.solve()
+    if s.load_cases:
+        s.solve_load_cases()
+    timings['solve'] = time.perf_counter() - t
+    if verbose:
+        print(f"{len(s.elements)} elements, {s._numberofdofs} DOFs, solver {type(s.solver).__name__}")
+
+    t = time.perf_counter()
+    if output and os.path.splitext(output)[1].lower() in results_io.FORMATS:
+        results_io.write_results(s, output, failure_criterion, append=append)
+        timings['write'] = time.perf_counter() - t
+        timings['total'] = time.perf_counter() - _t_start
+        return timings
+
+    results = {
+        'coords': s.node_coordinates(),
+        'connectivity': s.get_connectivity(),
+        'displacements': s.node_store.displacements[s._node_index],
+        'element_strains': s.recover_strains('element'),
+        'nodal_strains': s.recover_strains('nodal'),
+    }
+    if s.load_cases:
+        results['load_case_names'] = np.array(s.load_case_names)
+        results['load_case_displacements'] = s.load_case_displacements
+        # gleiche 6 Spalten wie element_strains (load_case_strains der Struktur hat nur 5)
+        results['load_case_strains'] = np.array([s.gauss_strains(u).mean(axis=1)
+                                                 for u in s.load_case_displacements])
+    if failure_criterion:
+        result = s.evaluate_failure(failure_criterion)
+        results.update(reserve_factor=result.reserve_factor, critical_ply=result.critical_ply)
+    if output:
+        np.savez(output, **results)
+    timings['write'] = time.perf_counter() - t
+    timings['total'] = time.perf_counter() - _t_start
+    return timings
+
+
+def show(description: dict, base_dir: str = '.') -> int:
+    # GUI-Module erst hier laden
+    from PyQt5.QtWidgets import QApplication
+    from Visualizer import StructureViewerWidget
+
+    app = QApplication(sys.argv)
+    window = StructureViewerWidget(build_model(description, base_dir))
+    window.setWindowTitle("OOP_FEM")
+    window.resize(900, 600)
+    window.show()
+    return app.exec_()
+
+
+def check_startup(budget: float = STARTUP_BUDGET) -> bool:
+    # trivialen Modelllauf messen; kein GUI-Modul darf geladen worden sein
+    timings = run(TRIVIAL_MODEL)
+    gui = sorted(m for m in sys.modules if m.split('.')[0] in GUI_MODULES)
+    print(f"startup: import {timings['import']:.3f} s, total {timings['total']:.3f} s (budget {budget:.3f} s)")
+    if gui:
+        print(f"GUI modules imported in batch mode: {gui}")
+    return timings['total'] <= budget and not gui
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Solve a shell model without GUI")
+    parser.add_argument('model', nargs='?', help="model description (YAML)")
+    parser.add_argument('-o', '--output', help="results file (.npz, .vtu/.pvd or .xdmf)")
+    parser.add_argument('--append', action='store_true', help="add the results as new steps to an existing .pvd/.xdmf")
+    parser.add_argument('--failure', choices=('tsai_wu', 'hashin', 'puck'), help="evaluate a failure criterion")
+    parser.add_argument('--timing', action='store_true', help="print the time of each step")
+    parser.add_argument('--verbose', action='store_true', help="print model size and solver")
+    parser.add_argument('--show', action='store_true', help="open the viewer instead of writing results")
+    parser.add_argument('--check-startup', action='store_true',
+                        help=f"run a trivial model and fail if it takes longer than {STARTUP_BUDGET} s")
+    args = parser.parse_args(argv)
+
+    if args.check_startup:
+        return 0 if check_startup() else 1
+    if args.model is None:
+        parser.error("a model file is required")
+
+    with open(args.model) as file:
+        description = yaml.safe_load(file)
+    base_dir = os.path.dirname(os.path.abspath(args.model))
+    if args.show:
+        return show(description, base_dir)
+
+    output = args.output or os.path.splitext(args.model)[0] + '_results.npz'
+    timings = run(description, output, base_dir, args.failure, args.verbose, args.append)
+    if args.timing:
+        print(' '.join(f"{step} {seconds:.3f} s" for step, seconds in timings.items()))
+    print(f"results written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
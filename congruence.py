@@ -0,0 +1,86 @@
+# Reuse of element stiffness matrices between congruent elements
+from collections import OrderedDict
+
+import numpy as np
+
+
+class StiffnessCache:
+    """Bounded LRU cache of element stiffness matrices.
+
+    The key is the element geometry relative to its first node, the laminate
+    layup, the material reference direction and the quadrature rule.
+    Elements that are translated copies of each other share one entry. The
+    B matrix of this element uses global x/y derivatives, so K_local is
+    not invariant to rotations and rotated copies are separate entries.
+    For translated copies the frame T is identical too, which is why the
+    global matrix is cached together with the local one.
+    atol: absolute tolerance for node offsets in model units.
+    """
+    def __init__(self, max_entries: int = 4096, atol: float = 1e-10):
+        self.max_entries = max_entries
+        self.atol = atol
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _group(self, coords, refs, lam_index, rule_index):
+        # Elemente mit gleichem quantisiertem Schluessel zusammenfassen
+        rel = coords[:, 1:] - coords[:, :1]
+        keys = np.column_stack([np.round(rel.reshape(len(coords), -1) / self.atol),
+                                np.round(refs / 1e-12), lam_index, rule_index]).astype(np.int64)
+        rows = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+        _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+        return keys, first, inverse.ravel()
+
+    def stiffness_matrices(self, coords: np.ndarray, refs: np.ndarray, lam_index: np.ndarray, layup_keys: list,
+                           rules, compute):
+        """(K_local, K_global) for all elements, computing only unknown geometries.
+
+        compute(element_ids) must return (K_local, K_global) for the given
+        elements, e.g. a call of element_kernels.stiffness_matrices.
+        """
+        n = coords.shape[0]
+        rules = np.broadcast_to(np.asarray(rules), (n,))
+        rule_names, rule_index = np.unique(rules, return_inverse=True)
+        keys, first, inverse = self._group(coords, refs, lam_index, rule_index.ravel())
+
+        cache_keys = [(keys[i, :12].tobytes(), layup_keys[lam_index[i]], str(rules[i])) for i in first]
+        unique_local = np.empty((first.size, 20, 20))
+        unique_global = np.empty((first.size, 20, 20))
+        missing = []
+        for k, key in enumerate(cache_keys):
+            entry = self._entries.get(key)
+            if entry is None:
+                missing.append(k)
+                continue
+            self._entries.move_to_end(key)
+            unique_local[k], unique_global[k] = entry
+        self.hits += first.size - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            missing = np.array(missing)
+            K_local, K_global = compute(first[missing])
+            unique_local[missing] = K_local
+            unique_global[missing] = K_global
+            for k in missing[-self.max_entries:]:
+                entry = (unique_local[k].copy(), unique_global[k].copy())
+                for matrix in entry:
+                    matrix.flags.writeable = False
+                self._entries[cache_keys[k]] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return unique_local[inverse], unique_global[inverse]
+
+
+# prozessweiter Standardcache, von allen Structures geteilt
+default_cache = StiffnessCache()
@@ -8,5 +8,12 @@ class Constraint:
     def __init__(self, dof1=True, dof2=True, dof3=True, dof4=True, dof5=True):
         self._free = np.array([dof1, dof2, dof3, dof4, dof5], dtype=bool)
 
+    @classmethod
+    def from_view(cls, free: np.ndarray) -> 'Constraint':
+        # Constraint direkt auf einer Zeile von NodeSet.free, ohne Kopie
+        c = cls.__new__(cls)
+        c._free = free
+        return c
+
     def get_constraints(self) -> np.ndarray:
         return self._free
\ No newline at end of file
@@ -0,0 +1,59 @@
+# Diagnostics for the assembled global system (singularity check, sparsity plot)
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+
+def find_singular_dofs(K, rel_tol: float = 1e-10) -> np.ndarray:
+    """Global DOF numbers that leave the stiffness matrix singular.
+
+    Free DOFs without any stiffness (empty rows) are reported directly. The
+    remaining rigid-body/mechanism modes show up as near-zero pivots of a
+    sparse LU factorization (pivot < rel_tol * max|diag(K)|).
+    """
+    K = sp.csc_matrix(K)
+    if K.shape[0] == 0:
+        return np.array([], dtype=int)
+
+    # wertebasiert, die Assemblierung speichert strukturelle Nullen der Elementbloecke mit
+    empty_rows = np.where(np.asarray(abs(K).sum(axis=1)).ravel() == 0.0)[0]
+    scale = np.abs(K.diagonal()).max()
+    if scale == 0.0:
+        return np.arange(K.shape[0])
+
+    # leere Zeilen auf 1 setzen, damit die Faktorisierung nur noch Mechanismen findet
+    fix = np.zeros(K.shape[0])
+    fix[empty_rows] = scale
+    K = K + sp.diags(fix)
+
+    try:
+        lu = spla.splu(K)
+    except RuntimeError:
+        # exakt singulaer: minimal regularisieren, Nullpivots bleiben winzig
+        lu = spla.splu(K + sp.identity(K.shape[0], format='csc') * scale * rel_tol * 1e-4)
+
+    # Pivot k gehoert zur Spalte perm_c[k] der Ausgangsmatrix
+    pivots = np.empty(K.shape[0])
+    pivots[lu.perm_c] = np.abs(lu.U.diagonal())
+    zero_pivots = np.where(pivots < rel_tol * scale)[0]
+
+    return np.union1d(empty_rows, zero_pivots)
+
+
+def locate_dofs(node_ids: np.ndarray, node_dofs: np.ndarray, dofs) -> list:
+    # globale DOF-Nummern -> [(Node ID, lokale DOFs)], node_dofs (n_nodes, 5)
+    hit = np.isin(node_dofs, dofs)
+    return [(node_ids[i], np.where(hit[i])[0]) for i in np.where(hit.any(axis=1))[0]]
+
+
+def plot_sparsity(K, ax=None, markersize: float = 1.0, show: bool = True):
+    # opt-in, matplotlib wird erst hier importiert
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        fig, ax = plt.subplots()
+    ax.spy(sp.csr_matrix(K), markersize=markersize)
+    ax.set_title(f"Global stiffness matrix, nnz = {sp.csr_matrix(K).nnz}")
+    if show:
+        plt.show()
+    return ax
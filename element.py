@@ -4,44 +4,104 @@
 import node
 import Laminate as lc
 import constraints
+import element_kernels
 
 import numpy as np
 from itertools import count
 
 class Element:
     _element_ids = count(0)
-    def __init__(self, n1:node.Node, n2:node.Node, n3:node.Node, n4:node.Node, laminate:lc.Laminate, ref:np.ndarray):
-        self._T = np.zeros((20,20))
-        self.stiffness_matrix_global = None
-        self.stiffness_matrix_local = None
+    # Integrationsregel aus quadrature.RULES, je Elementtyp (Unterklasse) oder Element ueberschreibbar
+    quadrature = '2x2'
+    def __init__(self, n1:node.Node, n2:node.Node, n3:node.Node, n4:node.Node, laminate:lc.Laminate, ref:np.ndarray,
+                 compute_stiffness: bool = False):
+        self._K_global = None
+        self._K_local = None
+        self._stiffness_dirty = True
         self.id = next(self._element_ids)
         self.laminate = laminate
         self.reference_system = ref
         self._dofNumbers = [0] * 20
         self._eps = None
-        self._e1 = None
-        self._e2 = None
-        self._e3 = None
+        # T, Tmat, e1-e3 und nodes_local werden erst beim ersten Zugriff berechnet
+        self._geometry = None
         self._Bm = None
         self._Bm_T = None
         self._Bb = None
         self._Bb_T = None
         self._Bc = None
         self._Bc_T = None
-        self._Tmat = None
 
         self.node1 = n1
         self.node2 = n2
         self.node3 = n3
         self.node4 = n4
         self.nodes = [self.node1, self.node2, self.node3, self.node4]
-        self.p_global = [n.node_position for n in self.nodes]
-        self._compute_T()
-        self._compute_Tmat()
-        self.nodes_local = None
-        self._calc_local_nodes()
         self.strains_avg_over_gp = None
-        self.compute_stiffness_matrix()
+        # Steifigkeit wird beim ersten Zugriff berechnet oder gebuendelt von Structure.compute_element_matrices
+        if compute_stiffness:
+            self.compute_stiffness_matrix()
+
+    @property
+    def stiffness_matrix_global(self) -> np.ndarray:
+        if self._stiffness_dirty:
+            self.compute_stiffness_matrix()
+        return self._K_global
+
+    @property
+    def stiffness_matrix_local(self) -> np.ndarray:
+        if self._stiffness_dirty:
+            self.compute_stiffness_matrix()
+        return self._K_local
+
+    def has_stiffness(self) -> bool:
+        return not self._stiffness_dirty
+
+    def invalidate(self) -> None:
+        # nach Knotenverschiebung oder Laminataenderung: Geometrie und Steifigkeit neu berechnen
+        self._geometry = None
+        self._stiffness_dirty = True
+
+    @property
+    def p_global(self):
+        return [n.node_position for n in self.nodes]
+
+    def _ensure_geometry(self) -> None:
+        if self._geometry is None:
+            self._geometry = {}
+            self._compute_T()
+            self._compute_Tmat()
+            self._calc_local_nodes()
+
+    @property
+    def _T(self) -> np.ndarray:
+        self._ensure_geometry()
+        return self._geometry['T']
+
+    @property
+    def _Tmat(self) -> np.ndarray:
+        self._ensure_geometry()
+        return self._geometry['Tmat']
+
+    @property
+    def _e1(self) -> np.ndarray:
+        self._ensure_geometry()
+        return self._geometry['e1']
+
+    @property
+    def _e2(self) -> np.ndarray:
+        self._ensure_geometry()
+        return self._geometry['e2']
+
+    @property
+    def _e3(self) -> np.ndarray:
+        self._ensure_geometry()
+        return self._geometry['e3']
+
+    @property
+    def nodes_local(self) -> np.ndarray:
+        self._ensure_geometry()
+        return self._geometry['nodes_local']
 
     @staticmethod
     def _shape_function(xi, eta):
@@ -67,50 +127,33 @@ class Element:
         return N, dN_dxi, dN_deta
 
     def compute_stiffness_matrix(self):
-
-        '''
-        A = np.array([
-            [103239, 7287.45, 0],
-            [7287.45, 103239, 0],
-            [0, 0, 6000]])
-
-        B = np.zeros_like(A)
-
-        D = np.array([
-            [15941.3, 874.494, 0],
-            [874.494, 8836.03, 0],
-            [0, 0, 720]])
-
-        ABD_Matrix = np.block([[A, B],
-                               [B, D]])
-        '''
         self.laminate.calc_ABD_matrices()
         ABD_Matrix = self.laminate.ABDij
-        Kloc = np.zeros((20, 20))
+        coords = np.array(self.p_global)[None]
 
-        # 2x2 Gauss-Punkte
-        gp = 1.0 / np.sqrt(3.0)
-        gauss = [(-gp, -gp), (gp, -gp), (gp, gp), (-gp, gp)]
-        weights = [1.0, 1.0, 1.0, 1.0]
+        K_local, K_global = element_kernels.stiffness_matrices(coords, ABD_Matrix, self.reference_system,
+                                                               rule=self.quadrature)
 
-        for (xi, eta), w in zip(gauss, weights):
-            Bc, detJ = self._calc_Bm_Bb_Bb(xi, eta)
-            Kloc += (Bc.T @ ABD_Matrix @ Bc) * detJ * w
-
-        self._compute_Tmat()
-
-        # Rotieren des Lokalen systems in das Matrerial koordinaten systems
-        Kloc_rotated = self._Tmat.T @ Kloc @ self._Tmat
+        if self._K_global is None:
+            self.bind_stiffness(K_local[0], K_global[0])
+        else:
+            # in place, damit gebuendelte Arrays der Structure aktuell bleiben
+            self._K_local[...] = K_local[0]
+            self._K_global[...] = K_global[0]
+            self._stiffness_dirty = False
 
-        self.stiffness_matrix_local = Kloc_rotated
-        self.stiffness_matrix_global = self._T.T @ self.stiffness_matrix_local @ self._T
+    def bind_stiffness(self, K_local: np.ndarray, K_global: np.ndarray) -> None:
+        # Element als View auf ein (n_elem, 20, 20) Array der Structure
+        self._K_local = K_local
+        self._K_global = K_global
+        self._stiffness_dirty = False
 
     def _calc_local_nodes(self):
         nodes_local_func = []
         for p in self.p_global:
             v = p - self.p_global[0]  # Ursprung in node1
             nodes_local_func.append((np.dot(v, self._e1), np.dot(v, self._e2)))
-        self.nodes_local = np.array(nodes_local_func)
+        self._geometry['nodes_local'] = np.array(nodes_local_func)
 
     def _compute_Tmat(self):
         # Projektion des reference koordinaten systems
@@ -124,7 +167,7 @@ class Element:
             R = np.eye(5)
             R[:2, :2] = np.column_stack((x_mat_local[:2], y_mat_local[:2]))
             Tmat[i * 5:i * 5 + 5, i * 5:i * 5 + 5] = R
-        self._Tmat = Tmat
+        self._geometry['Tmat'] = Tmat
 
     def _calc_Bm_Bb_Bb(self, xi, eta):
         N, dN_dxi, dN_deta = self._shape_function(xi, eta)
@@ -132,24 +175,20 @@ class Element:
 
         J, detJ, XYderivates = self._calc_Jacobian(naturalDerivatives)
 
-        Bm = np.zeros((3, 20))
-        Bb = np.zeros((3, 20))
-        for i in range(4):
-            c = i * 5
+        # Zeilen 0-2 Membran (Bm), 3-5 Biegung (Bb)
+        Bc = np.zeros((6, 20))
+        c = np.arange(4) * 5
+        dNx, dNy = XYderivates[:, 0], XYderivates[:, 1]
 
-            dNx, dNy = XYderivates[i, 0], XYderivates[i, 1]
+        Bc[0, c + 0] = dNx
+        Bc[1, c + 1] = dNy
+        Bc[2, c + 0] = dNy
+        Bc[2, c + 1] = dNx
 
-            Bm[0, c + 0] = dNx
-            Bm[1, c + 1] = dNy
-            Bm[2, c + 0] = dNy
-            Bm[2, c + 1] = dNx
-
-            Bb[0, c + 3] = dNx
-            Bb[1, c + 4] = dNy
-            Bb[2, c + 3] = dNy
-            Bb[2, c + 4] = dNx
-
-            Bc = np.vstack([Bm, Bb])
+        Bc[3, c + 3] = dNx
+        Bc[4, c + 4] = dNy
+        Bc[5, c + 3] = dNy
+        Bc[5, c + 4] = dNx
 
         return Bc, detJ
 
@@ -221,12 +260,6 @@ class Element:
     #    return Bc, detJ
 
     def compute_strain(self):
-
-        # 2x2 Gauss quadrature
-        gp = 1.0 / np.sqrt(3.0)
-        gauss = [(-gp, -gp), (gp, -gp), (gp, gp), (-gp, gp)]
-        weights = [1.0, 1.0, 1.0, 1.0]
-
         # Collect displacements into (20,) vector
         u_elem = np.hstack([
             self.node1.get_displacement(),
@@ -235,17 +268,14 @@ class Element:
             self.node4.get_displacement()
         ])
 
-        u_local = self._T @ u_elem
-        u_mat = self._Tmat.T @ u_local
-        strains_gp = []
-
-        for (xi, eta), w in zip(gauss, weights):
-            Bc, detJ = self._calc_Bm_Bb_Bb(xi, eta)
-            eps = Bc @ u_mat
-            strains_gp.append([eps[0], eps[1], eps[2], eps[3], eps[4]])
-
         # Average strains over Gauss points
-        self.strains_avg_over_gp = np.mean(strains_gp, axis=0)
+        self.strains_avg_over_gp = self.strain_from_displacements(u_elem)
+
+    def strain_from_displacements(self, u_elem: np.ndarray) -> np.ndarray:
+        # u_elem: (20,) oder (20, ncases) -> ueber die Gausspunkte gemittelte Dehnungen (5,) bzw. (5, ncases)
+        eps = element_kernels.strains(np.array(self.p_global)[None], self.reference_system,
+                                      np.asarray(u_elem)[None], rule=self.quadrature)
+        return eps[0, :, :5].mean(axis=0)
 
     def enumerate_dofs(self) -> None:
         self._dofNumbers = np.hstack((
@@ -271,10 +301,9 @@ class Element:
 
         R = np.array([e_1, e_2, e_3]) # Rotationsmatrix
 
+        T = np.zeros((20, 20))
         for i in range(4):
-            self._T[i * 5:i * 5 + 3, i * 5:i * 5 + 3] = R
-            self._T[i * 5 + 3:i * 5 + 5, i * 5 + 3:i * 5 + 5] = R[:2, :2]
+            T[i * 5:i * 5 + 3, i * 5:i * 5 + 3] = R
+            T[i * 5 + 3:i * 5 + 5, i * 5 + 3:i * 5 + 5] = R[:2, :2]
 
-        self._e1 = e_1
-        self._e2 = e_2
-        self._e3 = e_3
+        self._geometry.update(T=T, e1=e_1, e2=e_2, e3=e_3)
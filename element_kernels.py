@@ -0,0 +1,172 @@
+# Vectorized kernels for the 4-node shell element, evaluated for many elements at once
+import numpy as np
+
+import quadrature
+
+# 2x2 Gauss-Punkte, gleiche Reihenfolge wie in element.Element
+GAUSS_POINTS = quadrature.RULES['2x2'].points
+GAUSS_WEIGHTS = quadrature.RULES['2x2'].weights
+
+
+def shape_function_derivatives(points: np.ndarray) -> np.ndarray:
+    # (ngp, 2) natural coordinates -> (ngp, 4, 2) [dN/dxi, dN/deta], fuer beliebige Punkte (z.B. Punktsuche)
+    return quadrature.shape_functions(points)[1]
+
+
+def element_frames(coords: np.ndarray):
+    # (n, 4, 3) -> lokale Basisvektoren e1, e2, e3 je (n, 3), wie Element._compute_T
+    p1, p2, p3 = coords[:, 0], coords[:, 1], coords[:, 2]
+    e1 = p2 - p1
+    e1 /= np.linalg.norm(e1, axis=1, keepdims=True)
+    e2 = (p3 - p1) - np.sum((p3 - p1) * e1, axis=1, keepdims=True) * e1
+    e2 /= np.linalg.norm(e2, axis=1, keepdims=True)
+    e3 = np.cross(e1, e2)
+    return e1, e2, e3
+
+
+def _block_diagonal(R: np.ndarray) -> np.ndarray:
+    # (n, 5, 5) Knotenblock -> (n, 20, 20) blockdiagonal fuer alle 4 Knoten
+    T = np.zeros((R.shape[0], 20, 20))
+    for i in range(4):
+        T[:, i * 5:i * 5 + 5, i * 5:i * 5 + 5] = R
+    return T
+
+
+def transformation_matrices(coords: np.ndarray, ref: np.ndarray):
+    # liefert T (global -> lokal) und Tmat (lokal -> Material), beide (n, 20, 20)
+    n = coords.shape[0]
+    e1, e2, e3 = element_frames(coords)
+
+    R = np.zeros((n, 5, 5))
+    R[:, 0, :3] = e1
+    R[:, 1, :3] = e2
+    R[:, 2, :3] = e3
+    R[:, 3:5, 3:5] = R[:, 0:2, 0:2]
+
+    # Projektion des reference koordinaten systems
+    ref = np.broadcast_to(np.asarray(ref, dtype=float), (n, 3))
+    x_mat = ref - np.sum(ref * e3, axis=1, keepdims=True) * e3
+    x_mat /= np.linalg.norm(x_mat, axis=1, keepdims=True)
+    y_mat = np.cross(e3, x_mat)
+
+    Rmat = np.broadcast_to(np.eye(5), (n, 5, 5)).copy()
+    Rmat[:, :2, 0] = x_mat[:, :2]
+    Rmat[:, :2, 1] = y_mat[:, :2]
+
+    return _block_diagonal(R), _block_diagonal(Rmat)
+
+
+def strain_displacement_matrices(coords: np.ndarray, rule='2x2'):
+    # (n, 4, 3) -> Bc (n, ngp, 6, 20) und detJ (n, ngp), wie Element._calc_Bm_Bb_Bb
+    dN = quadrature.get_rule(rule).dN                            # (g, 4, 2)
+    J = np.einsum('nak,gai->ngki', coords, dN)                   # (n, g, 3, 2)
+    G = np.einsum('ngki,ngkj->ngij', J, J)                       # (n, g, 2, 2)
+    g_contra = J @ np.linalg.inv(G)                              # (n, g, 3, 2)
+    XY = np.einsum('gai,ngki->ngak', dN, g_contra)               # (n, g, 4, 3)
+    detJ = np.sqrt(np.linalg.det(G))
+
+    Bc = np.zeros(XY.shape[:2] + (6, 20))
+    dNx, dNy = XY[..., 0], XY[..., 1]
+    c = np.arange(4) * 5
+    Bc[..., 0, c + 0] = dNx
+    Bc[..., 1, c + 1] = dNy
+    Bc[..., 2, c + 0] = dNy
+    Bc[..., 2, c + 1] = dNx
+    Bc[..., 3, c + 3] = dNx
+    Bc[..., 4, c + 4] = dNy
+    Bc[..., 5, c + 3] = dNy
+    Bc[..., 5, c + 4] = dNx
+    return Bc, detJ
+
+
+def _integrate(coords: np.ndarray, abd: np.ndarray, rule: quadrature.QuadratureRule) -> np.ndarray:
+    # int Bc^T ABD Bc dA ueber die Punkte einer Regel, (m, 20, 20)
+    Bc, detJ = strain_displacement_matrices(coords, rule)
+    wdetJ = detJ * rule.weights
+    DB = abd[:, None] @ Bc                                       # (m, g, 6, 20)
+    return np.einsum('ngki,ngkj,ng->nij', Bc, DB, wdetJ, optimize=True)
+
+
+def _material_stiffness(coords: np.ndarray, abd: np.ndarray, rule: quadrature.QuadratureRule) -> np.ndarray:
+    if rule.reduced is None:
+        return _integrate(coords, abd, rule)
+    # selektiv: alle ABD-Terme mit Schubzeilen/-spalten mit der reduzierten Regel
+    shear = np.zeros(6, dtype=bool)
+    shear[quadrature.SHEAR_ROWS] = True
+    coupled = shear[:, None] | shear[None, :]
+    return (_integrate(coords, np.where(coupled, 0.0, abd), rule)
+            + _integrate(coords, np.where(coupled, abd, 0.0), rule.reduced))
+
+
+def stiffness_matrices(coords: np.ndarray, abd: np.ndarray, ref: np.ndarray, chunk_size: int = 4096,
+                       rule='2x2'):
+    """Element stiffness matrices for a batch of quads.
+
+    coords: (n, 4, 3) node coordinates, abd: (n, 6, 6) or (6, 6) laminate
+    ABD matrices, ref: (n, 3) or (3,) material reference directions,
+    rule: name in quadrature.RULES, or an (n,) array of names per element.
+    Returns (K_local, K_global), each (n, 20, 20), with the same meaning as
+    Element.stiffness_matrix_local and Element.stiffness_matrix_global.
+    """
+    coords = np.asarray(coords, dtype=float)
+    n = coords.shape[0]
+    abd = np.broadcast_to(np.asarray(abd, dtype=float), (n, 6, 6))
+    ref = np.broadcast_to(np.asarray(ref, dtype=float), (n, 3))
+
+    K_local = np.empty((n, 20, 20))
+    K_global = np.empty((n, 20, 20))
+
+    if not isinstance(rule, (str, quadrature.QuadratureRule)):
+        # gemischte Regeln: je Regel ein Aufruf
+        rule = np.asarray(rule)
+        for name in np.unique(rule):
+            rows = np.flatnonzero(rule == name)
+            K_local[rows], K_global[rows] = stiffness_matrices(coords[rows], abd[rows], ref[rows], chunk_size,
+                                                               str(name))
+        return K_local, K_global
+    rule = quadrature.get_rule(rule)
+
+    # in Bloecken, damit die (n, 4, 20, 20) Zwischenergebnisse klein bleiben
+    for start in range(0, n, chunk_size):
+        s = slice(start, min(start + chunk_size, n))
+        Kloc = _material_stiffness(coords[s], abd[s], rule)
+
+        T, Tmat = transformation_matrices(coords[s], ref[s])
+        K_local[s] = Tmat.transpose(0, 2, 1) @ Kloc @ Tmat
+        K_global[s] = T.transpose(0, 2, 1) @ K_local[s] @ T
+
+    return K_local, K_global
+
+
+def strains(coords: np.ndarray, ref: np.ndarray, u_elem: np.ndarray, rule='2x2',
+            chunk_size: int = 4096) -> np.ndarray:
+    """Membrane strains and curvatures at the Gauss points of rule for a batch of quads.
+
+    u_elem: (n, 20) global element displacements or (n, 20, k) for k load
+    cases. Returns (n, ngp, 6) or (n, ngp, 6, k) with
+    [eps_x, eps_y, gamma_xy, kappa_x, kappa_y, kappa_xy] in material axes,
+    the same values as Element.strain_from_displacements before averaging.
+    """
+    coords = np.asarray(coords, dtype=float)
+    u_elem = np.asarray(u_elem, dtype=float)
+    single = u_elem.ndim == 2
+    if single:
+        u_elem = u_elem[..., None]
+    n = coords.shape[0]
+    ref = np.broadcast_to(np.asarray(ref, dtype=float), (n, 3))
+
+    rule = quadrature.get_rule(rule)
+    eps = np.empty((n, rule.n_points, 6, u_elem.shape[-1]))
+    for start in range(0, n, chunk_size):
+        s = slice(start, min(start + chunk_size, n))
+        Bc, _ = strain_displacement_matrices(coords[s], rule)
+        T, Tmat = transformation_matrices(coords[s], ref[s])
+        u_mat = Tmat.transpose(0, 2, 1) @ (T @ u_elem[s])        # (m, 20, k)
+        eps[s] = Bc @ u_mat[:, None]
+
+    return eps[..., 0] if single else eps
+
+
+def gauss_to_nodes(rule='2x2') -> np.ndarray:
+    # (4, ngp) Extrapolation von Gausspunktwerten auf die Eckknoten ueber die bilinearen Formfunktionen
+    return np.linalg.pinv(quadrature.get_rule(rule).N)
@@ -0,0 +1,203 @@
+# Ply stresses and failure criteria for all elements, Gauss points, plies and ply surfaces at once
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+import helpers
+import Laminate as lc
+
+# Neigungsparameter nach VDI 2014, wenn das Material keine eigenen hat: (p_13_minus, p_13_plus, p_32_minus)
+PUCK_DEFAULTS = {
+    'CFK': (0.30, 0.35, 0.25),
+    'GFK': (0.25, 0.30, 0.20),
+}
+
+CRITERIA = ('tsai_wu', 'hashin', 'puck')
+
+
+@dataclass
+class PlyTable:
+    """Ply data of several laminates, padded to the largest ply count.
+
+    Padded plies have zero stiffness and therefore never become critical.
+    """
+    z: np.ndarray                 # (L, P, 2) Unter- und Oberseite der Lage
+    strain_transform: np.ndarray  # (L, P, 3, 3) Laminat-Achsen -> Materialachsen der Lage
+    stiffness: np.ndarray         # (L, P, 3, 3) Q im Materialachsensystem
+    strengths: np.ndarray         # (L, P, 6) R_1t, R_1c, R_2t, R_2c, R_31, R_32
+    puck: np.ndarray              # (L, P, 3) p_13_minus, p_13_plus, p_32_minus
+    tau_21_c: np.ndarray          # (L, P)
+    n_plies: np.ndarray           # (L,)
+
+    @classmethod
+    def from_laminates(cls, laminates: List[lc.Laminate]):
+        L = len(laminates)
+        P = max(len(lam.entries) for lam in laminates)
+        table = cls(z=np.zeros((L, P, 2)), strain_transform=np.zeros((L, P, 3, 3)), stiffness=np.zeros((L, P, 3, 3)),
+                    strengths=np.ones((L, P, 6)), puck=np.zeros((L, P, 3)), tau_21_c=np.ones((L, P)),
+                    n_plies=np.array([len(lam.entries) for lam in laminates]))
+
+        for l, lam in enumerate(laminates):
+            z_bot = -sum(ply.thickness for ply in lam.entries) / 2.0
+            for k, ply in enumerate(lam.entries):
+                # ABD kommt evtl. aus dem Cache, dann wurde Q der Lage noch nicht berechnet
+                ply.calc_global_stiffens_matrix()
+                m = ply.material
+                table.z[l, k] = z_bot, z_bot + ply.thickness
+                z_bot += ply.thickness
+                table.strain_transform[l, k] = helpers.transform_strains_to_local(ply.rotation_angle)
+                table.stiffness[l, k] = ply.local_stiffness_matrix
+                R_32 = m.R_32 if m.R_32 is not None else m.R_2c / 2.0
+                table.strengths[l, k] = m.R_1t, m.R_1c, m.R_2t, m.R_2c, m.R_31, R_32
+
+                defaults = PUCK_DEFAULTS.get(m.fibre_type, PUCK_DEFAULTS['CFK'])
+                p = [value if value is not None else default
+                     for value, default in zip((m.p_13_minus, m.p_13_plus, m.p_32_minus), defaults)]
+                table.puck[l, k] = p
+                table.tau_21_c[l, k] = m.tau_21_c if m.tau_21_c is not None else m.R_31 * np.sqrt(1 + 2 * p[2])
+        return table
+
+
+@dataclass
+class FailureResult:
+    criterion: str
+    reserve_factor: np.ndarray    # (n_elem,) kleinster Reservefaktor, inf ohne Belastung
+    critical_ply: np.ndarray      # (n_elem,) Lagenindex im Laminat
+    critical_gp: np.ndarray       # (n_elem,)
+    critical_side: np.ndarray     # (n_elem,) 0 = Unterseite, 1 = Oberseite der Lage
+
+    @property
+    def failure_index(self) -> np.ndarray:
+        with np.errstate(divide='ignore'):
+            return 1.0 / self.reserve_factor
+
+
+def ply_strains_stresses(strains: np.ndarray, table: PlyTable, lam_index: np.ndarray):
+    """Ply strains and stresses in material axes.
+
+    strains: (n, g, 6) mid-plane strains and curvatures as returned by
+    Structure.recover_strains('gauss'), lam_index: (n,) row in table.
+    Returns eps, sigma, each (n, g, P, 2, 3) with [1, 2, 12] components at
+    the bottom and top surface of every ply.
+    """
+    n, g = strains.shape[:2]
+    P = table.z.shape[1]
+    eps = np.empty((n, g, P, 2, 3))
+    sigma = np.empty((n, g, P, 2, 3))
+    # T und Q haengen nur von (Laminat, Lage) ab: je Laminat eine Matrixmultiplikation ueber alle Elemente
+    for l in np.unique(lam_index):
+        rows = np.flatnonzero(lam_index == l)
+        T = table.strain_transform[l].reshape(-1, 3).T                      # (3, P*3)
+        QT = (table.stiffness[l] @ table.strain_transform[l]).reshape(-1, 3).T
+        z = table.z[l][:, :, None]                                          # (P, 2, 1)
+        mid, curvature = strains[rows, :, :3], strains[rows, :, 3:]
+        for out, M in ((eps, T), (sigma, QT)):
+            out[rows] = ((mid @ M).reshape(-1, g, P, 1, 3)
+                         + z * (curvature @ M).reshape(-1, g, P, 1, 3))
+    return eps, sigma
+
+
+def _quadratic_reserve(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # kleinstes lambda > 0 mit a*lambda^2 + b*lambda = 1, stabile Form der Mitternachtsformel
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rf = 2.0 / (b + np.sqrt(b * b + 4.0 * a))
+    return np.where(rf > 0, rf, np.inf)
+
+
+def tsai_wu(sigma: np.ndarray, strengths: np.ndarray) -> np.ndarray:
+    # sigma (..., 3), strengths (..., 6) -> Reservefaktor (...)
+    s1, s2, t12 = np.moveaxis(sigma, -1, 0)
+    R1t, R1c, R2t, R2c, R21, _ = np.moveaxis(strengths, -1, 0)
+    F1, F2 = 1 / R1t - 1 / R1c, 1 / R2t - 1 / R2c
+    F11, F22, F66 = 1 / (R1t * R1c), 1 / (R2t * R2c), 1 / R21 ** 2
+    F12 = -0.5 * np.sqrt(F11 * F22)
+    a = F11 * s1 ** 2 + F22 * s2 ** 2 + F66 * t12 ** 2 + 2 * F12 * s1 * s2
+    return _quadratic_reserve(a, F1 * s1 + F2 * s2)
+
+
+def hashin(sigma: np.ndarray, strengths: np.ndarray) -> np.ndarray:
+    # ebener Spannungszustand, Minimum aus Faser- und Zwischenfaserbruch
+    s1, s2, t12 = np.moveaxis(sigma, -1, 0)
+    R1t, R1c, R2t, R2c, R21, R32 = np.moveaxis(strengths, -1, 0)
+    shear = (t12 / R21) ** 2
+    fibre = np.where(s1 >= 0, (s1 / R1t) ** 2 + shear, (s1 / R1c) ** 2)
+    matrix_a = np.where(s2 >= 0, (s2 / R2t) ** 2 + shear, (s2 / (2 * R32)) ** 2 + shear)
+    matrix_b = np.where(s2 >= 0, 0.0, ((R2c / (2 * R32)) ** 2 - 1) * s2 / R2c)
+    return np.minimum(_quadratic_reserve(fibre, np.zeros_like(fibre)), _quadratic_reserve(matrix_a, matrix_b))
+
+
+def puck(sigma: np.ndarray, strengths: np.ndarray, puck_parameters: np.ndarray, tau_21_c: np.ndarray) -> np.ndarray:
+    # Faserbruch und Zwischenfaserbruch Modus A/B/C, alle Anstrengungen linear in der Last
+    s1, s2, t21 = np.moveaxis(sigma, -1, 0)
+    t21 = np.abs(t21)
+    R1t, R1c, R2t, R2c, R21, _ = np.moveaxis(strengths, -1, 0)
+    p_minus, p_plus, p_22_minus = np.moveaxis(puck_parameters, -1, 0)
+    R22A = R2c / (2 * (1 + p_22_minus))
+
+    fibre = np.where(s1 >= 0, s1 / R1t, -s1 / R1c)
+    mode_a = np.sqrt((t21 / R21) ** 2 + ((1 - p_plus * R2t / R21) * s2 / R2t) ** 2) + p_plus * s2 / R21
+    mode_b = (np.sqrt(t21 ** 2 + (p_minus * s2) ** 2) + p_minus * s2) / R21
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mode_c = ((t21 / (2 * (1 + p_22_minus) * R21)) ** 2 + (s2 / R2c) ** 2) * R2c / -s2
+    in_b = np.abs(s2) * tau_21_c <= R22A * t21
+    inter_fibre = np.where(s2 >= 0, mode_a, np.where(in_b, mode_b, mode_c))
+
+    with np.errstate(divide='ignore'):
+        return 1.0 / np.maximum(fibre, inter_fibre)
+
+
+def reserve_factors(sigma: np.ndarray, table: PlyTable, lam_index: np.ndarray, criterion: str) -> np.ndarray:
+    # sigma (n, g, P, 2, 3) -> (n, g, P, 2)
+    strengths = table.strengths[lam_index][:, None, :, None]
+    if criterion == 'tsai_wu':
+        return tsai_wu(sigma, strengths)
+    if criterion == 'hashin':
+        return hashin(sigma, strengths)
+    if criterion == 'puck':
+        return puck(sigma, strengths, table.puck[lam_index][:, None, :, None],
+                    table.tau_21_c[lam_index][:, None, :, None])
+    raise ValueError(f"Unknown failure criterion '{criterion}', expected one of {CRITERIA}")
+
+
+def evaluate(strains: np.ndarray, laminates: List[lc.Laminate], lam_index: np.ndarray, criterion: str = 'tsai_wu',
+             chunk_size: int = 4096) -> FailureResult:
+    """Critical ply and reserve factor per element.
+
+    strains: (n, g, 6) from Structure.recover_strains('gauss'), laminates
+    and lam_index map every element to its laminate. Evaluated in chunks of
+    chunk_size elements so the (n, g, P, 2) intermediates stay small.
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"Unknown failure criterion '{criterion}', expected one of {CRITERIA}")
+    table = PlyTable.from_laminates(laminates)
+    n = strains.shape[0]
+    rf = np.empty(n)
+    location = np.empty(n, dtype=np.int64)
+
+    for start in range(0, n, chunk_size):
+        s = slice(start, min(start + chunk_size, n))
+        _, sigma = ply_strains_stresses(strains[s], table, lam_index[s])
+        chunk_rf = reserve_factors(sigma, table, lam_index[s], criterion).reshape(sigma.shape[0], -1)
+        location[s] = np.argmin(chunk_rf, axis=1)
+        rf[s] = chunk_rf[np.arange(chunk_rf.shape[0]), location[s]]
+
+    gp, ply, side = np.unravel_index(location, (strains.shape[1], table.z.shape[1], 2))
+    return FailureResult(criterion=criterion, reserve_factor=rf, critical_ply=ply, critical_gp=gp, critical_side=side)
+
+
+def element_ply_stresses(strains: np.ndarray, laminates: List[lc.Laminate], lam_index: np.ndarray,
+                         chunk_size: int = 4096) -> np.ndarray:
+    """Ply stresses [sigma_1, sigma_2, tau_12] per element, (n, P, 3).
+
+    Averaged over the Gauss points and taken at the ply mid-plane (mean of
+    bottom and top surface). Padded plies of thinner laminates are zero.
+    """
+    table = PlyTable.from_laminates(laminates)
+    n = strains.shape[0]
+    out = np.empty((n, table.z.shape[1], 3))
+    for start in range(0, n, chunk_size):
+        s = slice(start, min(start + chunk_size, n))
+        _, sigma = ply_strains_stresses(strains[s], table, lam_index[s])
+        out[s] = sigma.mean(axis=(1, 3))
+    return out
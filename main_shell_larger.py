@@ -1,14 +1,9 @@
 import sys
 
 import numpy as np
-from PyQt5.QtWidgets import QApplication
-import structure
 import constraints
 import forces
-from Visualizer import StructureViewerWidget
-import element
-import node
-import random
+import mesh
 import Plies
 import Laminate as lc
 import Material
@@ -36,45 +31,20 @@ def main():
     #seting up a plate
 
     N = 5
-    Lx, Ly, Lz = 2, 2, 0.4
-    dx, dy, dz = Lx / N, Ly / N, Lz / N
+    Lx, Ly = 2, 2
 
+    plate = mesh.rectangular_plate(Lx, Ly, N, N)
+    shell_struct_1 = mesh.build_structure(plate, Lam_1, ref=ref_sys)
 
+    # clamp on one side x=0 fully, w is locked everywhere else
+    shell_struct_1.set_constraints('all', constraints.Constraint(True, True, False, True, True))
+    shell_struct_1.set_constraints('x0', constraints.Constraint(False, False, False, False, False))
+    shell_struct_1.set_forces('x1', forces.Force(5000, 1000, 1000, 0, 0))
 
-    nodes = []
-    for j in range(N + 1):  # N+1 nodes in each direction
-        row = []
-        for i in range(N + 1):
-            row.append(node.Node(i * dx, j * dy,0))
-        nodes.append(row)
-
-    elements = []
-    for j in range(N):
-        for i in range(N):
-            n0 = nodes[j][i]
-            n1 = nodes[j + 1][i]
-            n2 = nodes[j + 1][i + 1]
-            n3 = nodes[j][i + 1]
-            elements.append(element.Element(n0, n1, n2, n3, Lam_1, ref=ref_sys))
-
-    # clamp on one side x=0 fully but only looking the y direction on one corener
-    for row in nodes:
-        for n in row:
-            if n.node_position[0] == 0 and n.node_position[1] == 0:
-                n.constraints = constraints.Constraint(False, False, False, False, False)
-            elif n.node_position[0] == 0:
-                n.constraints = constraints.Constraint(False, False, False, False, False)
-            else:
-                n.constraints = constraints.Constraint(True, True, False, True, True)
-
-            if n.node_position[0] == Lx:
-                n.force = forces.Force(5000, 1000, 1000, 0, 0)
-
-    shell_struct_1 = structure.Structure()
-
-    for e in elements:
-        shell_struct_1.add_element(e)
 
+    # GUI erst nach dem Modellaufbau laden
+    from PyQt5.QtWidgets import QApplication
+    from Visualizer import StructureViewerWidget
 
     app = QApplication(sys.argv) # Initialize Qt app
     window = StructureViewerWidget(shell_struct_1)
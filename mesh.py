@@ -0,0 +1,131 @@
+# Structured quad mesh generation (rectangular plates, cylinders, curved panels)
+import gc
+from dataclasses import dataclass, field
+from typing import Dict
+
+import numpy as np
+
+import node
+import element
+import structure
+
+
+@dataclass
+class Mesh:
+    coords: np.ndarray                      # (n_nodes, 3)
+    connectivity: np.ndarray                # (n_elem, 4), Indizes in coords
+    node_sets: Dict[str, np.ndarray] = field(default_factory=dict)
+    element_sets: Dict[str, np.ndarray] = field(default_factory=dict)   # Indizes in connectivity
+
+    @property
+    def n_nodes(self) -> int:
+        return self.coords.shape[0]
+
+    @property
+    def n_elements(self) -> int:
+        return self.connectivity.shape[0]
+
+
+def _grid_connectivity(n1: int, n2: int, wrap: bool = False) -> np.ndarray:
+    # Knoten k = j * n1 + i auf einem (n1 x n2) Gitter, Knotenfolge wie in main_shell_larger.py:
+    # (i, j), (i, j+1), (i+1, j+1), (i+1, j)
+    n_i = n1 if wrap else n1 - 1
+    i, j = np.meshgrid(np.arange(n_i), np.arange(n2 - 1), indexing='xy')
+    i, j = i.ravel(), j.ravel()
+    i_next = (i + 1) % n1
+    return np.column_stack([
+        j * n1 + i,
+        (j + 1) * n1 + i,
+        (j + 1) * n1 + i_next,
+        j * n1 + i_next,
+    ]).astype(np.int64)
+
+
+def _edge_sets(n1: int, n2: int, names) -> Dict[str, np.ndarray]:
+    ids = np.arange(n1 * n2).reshape(n2, n1)
+    return {
+        names[0]: ids[:, 0].copy(),
+        names[1]: ids[:, -1].copy(),
+        names[2]: ids[0, :].copy(),
+        names[3]: ids[-1, :].copy(),
+        'all': ids.ravel(),
+    }
+
+
+def rectangular_plate(Lx: float, Ly: float, nx: int, ny: int, origin=(0.0, 0.0, 0.0)) -> Mesh:
+    """Flat nx x ny quad grid in the xy-plane.
+
+    Node sets: 'x0'/'x1' (edges x = origin, x = origin + Lx), 'y0'/'y1' and 'all'.
+    """
+    x = np.linspace(0.0, Lx, nx + 1)
+    y = np.linspace(0.0, Ly, ny + 1)
+    X, Y = np.meshgrid(x, y, indexing='xy')
+    coords = np.column_stack([X.ravel(), Y.ravel(), np.zeros(X.size)]) + np.asarray(origin, dtype=float)
+    return Mesh(coords, _grid_connectivity(nx + 1, ny + 1), _edge_sets(nx + 1, ny + 1, ('x0', 'x1', 'y0', 'y1')))
+
+
+def cylindrical_panel(radius: float, length: float, n_circ: int, n_axial: int,
+                      arc_angle: float = 2 * np.pi, origin=(0.0, 0.0, 0.0)) -> Mesh:
+    """Cylinder (arc_angle = 2 pi) or open curved panel around the x-axis.
+
+    Node (i, j) sits at x = j * length / n_axial, angle = i * arc_angle / n_circ,
+    y = r cos(angle), z = r sin(angle). Node sets: 'x0'/'x1' (ends), 'all' and,
+    for an open panel, 'theta0'/'theta1' (straight edges).
+    """
+    closed = np.isclose(arc_angle, 2 * np.pi)
+    n_i = n_circ if closed else n_circ + 1
+    theta = np.arange(n_i) * (arc_angle / n_circ)
+    x = np.linspace(0.0, length, n_axial + 1)
+    T, X = np.meshgrid(theta, x, indexing='xy')
+    coords = np.column_stack([X.ravel(), radius * np.cos(T.ravel()), radius * np.sin(T.ravel())])
+    coords += np.asarray(origin, dtype=float)
+
+    edges = _edge_sets(n_i, n_axial + 1, ('theta0', 'theta1', 'x0', 'x1'))
+    if closed:
+        del edges['theta0'], edges['theta1']
+    return Mesh(coords, _grid_connectivity(n_i, n_axial + 1, wrap=closed), edges)
+
+
+def curved_panel(radius: float, arc_angle: float, length: float, n_circ: int, n_axial: int,
+                 origin=(0.0, 0.0, 0.0)) -> Mesh:
+    return cylindrical_panel(radius, length, n_circ, n_axial, arc_angle=arc_angle, origin=origin)
+
+
+def build_structure(m: Mesh, laminate, ref: np.ndarray,
+                    store: node.NodeSet = None, laminate_index: np.ndarray = None,
+                    **structure_kwargs) -> structure.Structure:
+    """Create all nodes and elements of a mesh in bulk.
+
+    Nodes are appended to `store` (default: the shared Node.store) with one
+    NodeSet.add, element stiffness matrices are left to the batched
+    Structure.compute_element_matrices. The mesh node and element sets are
+    registered on the structure as Structure.node_sets and
+    Structure.element_sets. laminate may be a list of
+    laminates together with laminate_index, one entry per element.
+    """
+    store = node.Node.store if store is None else store
+    rows = store.add(m.coords)
+    ref = np.asarray(ref, dtype=float)
+
+    # Millionen kurzlebiger Objekte: zyklische GC waehrend des Aufbaus aussetzen
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        nodes = [node.Node.from_store(store, r) for r in rows.tolist()]
+        if laminate_index is None:
+            elements = [element.Element(nodes[a], nodes[b], nodes[c], nodes[d], laminate, ref)
+                        for a, b, c, d in m.connectivity.tolist()]
+        else:
+            elements = [element.Element(nodes[a], nodes[b], nodes[c], nodes[d], laminate[k], ref)
+                        for (a, b, c, d), k in zip(m.connectivity.tolist(), np.asarray(laminate_index).tolist())]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    s = structure.Structure(**structure_kwargs)
+    s.add_elements(elements, nodes=nodes, connectivity=m.connectivity)
+    for name, ids in m.node_sets.items():
+        s.add_node_set(name, ids)
+    for name, ids in m.element_sets.items():
+        s.add_element_set(name, ids)
+    return s
@@ -0,0 +1,420 @@
+# Streaming import of Gmsh (.msh 4.1, ASCII/binary) and Abaqus (.inp) quad meshes into mesh.Mesh arrays
+import os
+import re
+import warnings
+
+import numpy as np
+
+import mesh
+
+BLOCK_SIZE = 1 << 22   # Bytes pro gelesenem Textblock
+
+# Gmsh-Elementtypen: Anzahl Knoten; 3 = 4-Knoten-Viereck, weitere Typen nur fuer Knotensets
+_GMSH_NODES_PER_ELEMENT = {1: 2, 2: 3, 3: 4, 4: 4, 5: 8, 6: 6, 7: 5, 8: 3, 9: 6, 10: 9, 11: 10, 15: 1, 16: 8}
+_GMSH_QUAD = 3
+_ABAQUS_SHELL_QUADS = ('S4', 'S4R', 'S4R5', 'S4RS', 'S4RSW')
+_ABAQUS_KEYWORDS = ('NODE', 'ELEMENT', 'NSET', 'ELSET')   # alle anderen Abschnitte werden ueberlesen
+# Zeichen, die in keiner ganzen Zahl vorkommen: Block enthaelt Setnamen
+_NON_INTEGER = re.compile(rb'[^\s\d+-]')
+
+
+class _NumberStream:
+    """Numbers of one text section, parsed block by block.
+
+    The section ends before the first line that starts with `marker`; the
+    file is left positioned at that line. Every block holds whole lines, so
+    rows never straddle two blocks.
+    """
+    def __init__(self, fh, marker: bytes, separator: bytes = None, block_size: int = BLOCK_SIZE):
+        self._fh = fh
+        self._marker = marker
+        self._separator = separator
+        self._block_size = block_size
+        self._numbers = np.empty(0)
+        self._pos = 0
+        self.done = False
+
+    def blocks(self):
+        # liefert die Zahlen je Block, bis das Abschnittsende erreicht ist
+        while not self.done:
+            numbers = self._read_block()
+            if numbers.size:
+                yield numbers
+
+    def _read_block(self) -> np.ndarray:
+        return np.fromstring(self.read_text(), sep=' ')
+
+    def read_text(self) -> bytes:
+        # naechster Block ganzer Zeilen des Abschnitts, Trennzeichen bereits durch Leerzeichen ersetzt
+        fh = self._fh
+        start = fh.tell()
+        data = fh.read(self._block_size)
+        if not data:
+            self.done = True
+            return b''
+        if data.startswith(self._marker):
+            end = 0
+        else:
+            end = data.find(b'\n' + self._marker)
+            end = end + 1 if end != -1 else -1
+        if end != -1:
+            self.done = True
+        elif len(data) < self._block_size:
+            end = len(data)
+            self.done = True
+        else:
+            end = data.rfind(b'\n') + 1
+            if end == 0:
+                raise ValueError(f"Line longer than {self._block_size} bytes")
+        fh.seek(start + end)
+        data = data[:end]
+        if self._separator is not None:
+            data = data.replace(self._separator, b' ')
+        return data
+
+    def take(self, count: int) -> np.ndarray:
+        # die naechsten count Zahlen, auch ueber Blockgrenzen hinweg
+        parts = [np.empty(0)]
+        while count > 0:
+            if self._pos == self._numbers.size:
+                if self.done:
+                    raise ValueError("Unexpected end of section")
+                self._numbers, self._pos = self._read_block(), 0
+                continue
+            part = self._numbers[self._pos:self._pos + count]
+            self._pos += part.size
+            count -= part.size
+            parts.append(part)
+        return parts[-1] if len(parts) <= 2 else np.concatenate(parts)
+
+
+class _GmshBinary:
+    # gleiche Schnittstelle wie _GmshAscii, liest direkt in Arrays
+    def __init__(self, fh, size_t: int):
+        self._fh = fh
+        self._size_t = np.dtype('<u8' if size_t == 8 else '<u4')
+
+    def _read(self, dtype, count: int) -> np.ndarray:
+        values = np.empty(count, dtype=dtype)
+        if self._fh.readinto(memoryview(values).cast('B')) != values.nbytes:
+            raise ValueError("Unexpected end of binary section")
+        return values
+
+    def ints(self, count: int = 1) -> np.ndarray:
+        return self._read('<i4', count).astype(np.int64)
+
+    def sizes(self, count: int = 1) -> np.ndarray:
+        return self._read(self._size_t, count).astype(np.int64)
+
+    def doubles(self, count: int = 1) -> np.ndarray:
+        return self._read('<f8', count)
+
+    def finish(self) -> None:
+        # Zeilenende nach den Binaerdaten
+        self._fh.readline()
+
+
+class _GmshAscii:
+    def __init__(self, fh, block_size: int = BLOCK_SIZE):
+        self._stream = _NumberStream(fh, b'$', block_size=block_size)
+
+    def ints(self, count: int = 1) -> np.ndarray:
+        return self._stream.take(count).astype(np.int64)
+
+    sizes = ints
+
+    def doubles(self, count: int = 1) -> np.ndarray:
+        return self._stream.take(count)
+
+    def finish(self) -> None:
+        pass
+
+
+def _index_map(tags: np.ndarray):
+    """Tag -> consecutive index, index(t) for arrays of tags.
+
+    Unknown tags raise ValueError; index(t, drop=True) removes them from
+    the result instead (e.g. set members that refer to skipped elements).
+    Dense lookup table when the tags are compact, otherwise sorted search.
+    """
+    if tags.size == 0:
+        lookup = lambda t: np.full(t.shape, -1, dtype=np.int64)
+    elif int(tags.max()) <= 4 * tags.size + 1024:
+        max_tag = int(tags.max())
+        table = np.full(max_tag + 1, -1, dtype=np.int64)
+        table[tags] = np.arange(tags.size)
+        lookup = lambda t: np.where((t < 0) | (t > max_tag), -1, table[np.clip(t, 0, max_tag)])
+    else:
+        order = np.argsort(tags, kind='stable')
+        sorted_tags = tags[order]
+
+        def lookup(t):
+            pos = np.clip(np.searchsorted(sorted_tags, t), 0, sorted_tags.size - 1)
+            return np.where(sorted_tags[pos] == t, order[pos], -1)
+
+    def index(t, drop: bool = False):
+        found = lookup(np.asarray(t, dtype=np.int64))
+        if drop:
+            return found[found != -1]
+        if np.any(found == -1):
+            raise ValueError("Reference to an undefined node or element tag")
+        return found
+    return index
+
+
+def _set_indices(kind: str, name: str, index, tags: np.ndarray) -> np.ndarray:
+    # Setmitglieder ohne passenden Knoten/Element (z.B. uebersprungene Elementtypen) mit Warnung verwerfen
+    found = index(tags, drop=True)
+    if found.size < tags.size:
+        warnings.warn(f"{kind} '{name}': dropped {tags.size - found.size} members that refer to "
+                      f"undefined or skipped entries")
+    return np.unique(found)
+
+
+def read_gmsh(path: str, block_size: int = BLOCK_SIZE) -> mesh.Mesh:
+    """Read a Gmsh 4.1 mesh (ASCII or binary).
+
+    4-node quads (type 3) become the elements. Every named physical group
+    becomes a node set with the nodes of its elements; physical groups of
+    surfaces also become element sets.
+    """
+    physical_names = {}
+    entity_physicals = {}
+    node_tags, node_coords = [], []
+    quad_tags, quads, quad_entities = [], [], []
+    entity_nodes = {}
+    open_section = None
+
+    with open(path, 'rb') as fh:
+        while True:
+            line = fh.readline()
+            if not line:
+                break
+            section = line.strip()
+            if section == b'$MeshFormat':
+                version, file_type, data_size = fh.readline().split()
+                if version != b'4.1':
+                    raise ValueError(f"Unsupported MSH version {version.decode()}, only Gmsh format 4.1 is supported")
+                if int(file_type) == 1:
+                    if np.frombuffer(fh.read(4), '<i4')[0] != 1:
+                        raise ValueError("Big-endian Gmsh files are not supported")
+                    fh.readline()
+                    open_section = lambda: _GmshBinary(fh, int(data_size))
+                else:
+                    open_section = lambda: _GmshAscii(fh, block_size)
+            elif section == b'$PhysicalNames':
+                for _ in range(int(fh.readline())):
+                    dim, tag, name = fh.readline().decode().split(maxsplit=2)
+                    physical_names[(int(dim), int(tag))] = name.strip().strip('"')
+            elif section == b'$Entities':
+                stream = open_section()
+                counts = stream.sizes(4)
+                for dim, count in enumerate(counts.tolist()):
+                    for _ in range(count):
+                        tag = int(stream.ints()[0])
+                        stream.doubles(3 if dim == 0 else 6)
+                        physicals = stream.ints(int(stream.sizes()[0]))
+                        entity_physicals[(dim, tag)] = physicals.tolist()
+                        if dim > 0:
+                            stream.ints(int(stream.sizes()[0]))
+                stream.finish()
+            elif section == b'$Nodes':
+                stream = open_section()
+                n_blocks = int(stream.sizes(4)[0])
+                for _ in range(n_blocks):
+                    dim, tag, parametric = stream.ints(3).tolist()
+                    count = int(stream.sizes()[0])
+                    tags = stream.sizes(count)
+                    columns = 3 + (dim if parametric else 0)
+                    coords = stream.doubles(count * columns).reshape(count, columns)[:, :3]
+                    node_tags.append(tags)
+                    node_coords.append(coords)
+                    entity_nodes.setdefault((dim, tag), []).append(tags)
+                stream.finish()
+            elif section == b'$Elements':
+                stream = open_section()
+                n_blocks = int(stream.sizes(4)[0])
+                skipped = 0
+                for _ in range(n_blocks):
+                    dim, tag, element_type = stream.ints(3).tolist()
+                    count = int(stream.sizes()[0])
+                    if element_type not in _GMSH_NODES_PER_ELEMENT:
+                        raise ValueError(f"Unsupported Gmsh element type {element_type}")
+                    n_nodes = _GMSH_NODES_PER_ELEMENT[element_type]
+                    data = stream.sizes(count * (n_nodes + 1)).reshape(count, n_nodes + 1)
+                    entity_nodes.setdefault((dim, tag), []).append(data[:, 1:].ravel())
+                    if element_type == _GMSH_QUAD:
+                        quad_tags.append(data[:, 0])
+                        quads.append(data[:, 1:])
+                        quad_entities.append(np.full(count, tag))
+                    elif dim == 2:
+                        skipped += count
+                stream.finish()
+                if skipped:
+                    warnings.warn(f"Skipped {skipped} surface elements that are not 4-node quads")
+            elif section.startswith(b'$') and not section.startswith(b'$End'):
+                # unbekannter Abschnitt
+                end = b'$End' + section[1:]
+                while line and line.strip() != end:
+                    line = fh.readline()
+
+    tags = np.concatenate(node_tags) if node_tags else np.empty(0, dtype=np.int64)
+    node_index = _index_map(tags)
+    m = mesh.Mesh(np.concatenate(node_coords) if node_coords else np.empty((0, 3)),
+                  node_index(np.concatenate(quads)) if quads else np.empty((0, 4), dtype=np.int64))
+    m.node_sets['all'] = np.arange(m.n_nodes)
+
+    quad_entities = np.concatenate(quad_entities) if quad_entities else np.empty(0, dtype=np.int64)
+    for (dim, physical), name in physical_names.items():
+        entities = [key for key, physicals in entity_physicals.items() if key[0] == dim and physical in physicals]
+        nodes = [t for key in entities for t in entity_nodes.get(key, [])]
+        m.node_sets[name] = np.unique(node_index(np.concatenate(nodes))) if nodes else np.empty(0, dtype=np.int64)
+        if dim == 2:
+            m.element_sets[name] = np.flatnonzero(np.isin(quad_entities, [tag for _, tag in entities]))
+    return _remove_unused_nodes(m)
+
+
+_KEYWORD = re.compile(rb'^\*\s*([A-Za-z ]+?)\s*(?:,|$)')
+
+
+def _parameters(line: bytes) -> dict:
+    # "*ELEMENT, TYPE=S4R, ELSET=skin" -> {'TYPE': 'S4R', 'ELSET': 'skin'}; Flags ohne Wert -> True
+    parameters = {}
+    for item in line.decode().split(',')[1:]:
+        key, _, value = item.partition('=')
+        parameters[key.strip().upper()] = value.strip() if value else True
+    return parameters
+
+
+def _set_members(stream: _NumberStream, generate: bool, sets: dict, kind: str) -> np.ndarray:
+    # Datenzeilen eines *NSET/*ELSET: Tags, GENERATE-Bereiche oder Namen bereits gelesener Sets
+    parts = [np.empty(0, dtype=np.int64)]
+    while not stream.done:
+        text = stream.read_text()
+        # vorher pruefen statt auf den ValueError von fromstring zu bauen (NumPy 1.x schneidet nur ab)
+        if not _NON_INTEGER.search(text):
+            parts.append(np.fromstring(text, sep=' ').astype(np.int64))
+            continue
+        if generate:
+            raise ValueError(f"*{kind} with GENERATE expects 'first, last, increment', got {text[:80]!r}")
+        # langsamer Weg nur fuer Bloecke mit Setnamen
+        names = {key.upper(): key for key in sets}
+        for token in text.split():
+            if token.lstrip(b'-').isdigit():
+                parts.append(np.array([int(token)]))
+            elif token.decode().upper() in names:
+                parts.extend(sets[names[token.decode().upper()]])
+            else:
+                raise ValueError(f"*{kind} refers to '{token.decode()}', which is neither a number nor a "
+                                 f"previously defined {kind.lower()}")
+    values = np.concatenate(parts).astype(np.int64)
+    if not generate:
+        return values
+    return np.concatenate([np.arange(a, b + 1, max(c, 1)) for a, b, c in values.reshape(-1, 3)] or
+                          [np.empty(0, dtype=np.int64)])
+
+
+def read_abaqus(path: str, block_size: int = BLOCK_SIZE) -> mesh.Mesh:
+    """Read nodes, S4/S4R shell elements, NSET and ELSET from an Abaqus input file.
+
+    Data lines are parsed block by block into arrays. Element sets also
+    become node sets (the nodes of their elements) unless a node set of the
+    same name exists.
+    """
+    node_ids, node_coords = [], []
+    element_ids, elements = [], []
+    nsets, elsets = {}, {}
+    keyword, parameters = None, {}
+    skipped = set()
+
+    def add(sets, name, members):
+        sets.setdefault(name, []).append(members)
+
+    with open(path, 'rb') as fh:
+        while True:
+            line = fh.readline()
+            if not line:
+                break
+            if line.startswith(b'**'):
+                continue
+            if line.startswith(b'*'):
+                match = _KEYWORD.match(line)
+                keyword = match.group(1).upper().decode() if match else None
+                parameters = _parameters(line)
+                if keyword not in _ABAQUS_KEYWORDS:
+                    continue
+            elif keyword not in _ABAQUS_KEYWORDS or not line.strip():
+                continue
+            else:
+                # Datenzeile: zurueck an den Zeilenanfang und den ganzen Block lesen
+                fh.seek(fh.tell() - len(line))
+
+            stream = _NumberStream(fh, b'*', b',', block_size)
+            if keyword == 'NODE':
+                first = fh.readline()
+                fh.seek(fh.tell() - len(first))
+                columns = len([v for v in first.split(b',') if v.strip()])
+                for numbers in stream.blocks():
+                    rows = numbers.reshape(-1, columns)
+                    coords = np.zeros((rows.shape[0], 3))
+                    coords[:, :columns - 1] = rows[:, 1:4]
+                    node_ids.append(rows[:, 0].astype(np.int64))
+                    node_coords.append(coords)
+                    if 'NSET' in parameters:
+                        add(nsets, parameters['NSET'], node_ids[-1])
+            elif keyword == 'ELEMENT':
+                element_type = str(parameters.get('TYPE', '')).upper()
+                for numbers in stream.blocks():
+                    if element_type not in _ABAQUS_SHELL_QUADS:
+                        skipped.add(element_type)
+                        continue
+                    rows = numbers.reshape(-1, 5).astype(np.int64)
+                    element_ids.append(rows[:, 0])
+                    elements.append(rows[:, 1:])
+                    if 'ELSET' in parameters:
+                        add(elsets, parameters['ELSET'], rows[:, 0])
+            elif keyword in ('NSET', 'ELSET'):
+                sets = nsets if keyword == 'NSET' else elsets
+                add(sets, parameters[keyword], _set_members(stream, 'GENERATE' in parameters, sets, keyword))
+    if skipped:
+        warnings.warn(f"Skipped elements of type {sorted(skipped)}, only 4-node shells {_ABAQUS_SHELL_QUADS} are read")
+
+    tags = np.concatenate(node_ids) if node_ids else np.empty(0, dtype=np.int64)
+    node_index = _index_map(tags)
+    element_tags = np.concatenate(element_ids) if element_ids else np.empty(0, dtype=np.int64)
+    element_index = _index_map(element_tags)
+    m = mesh.Mesh(np.concatenate(node_coords) if node_coords else np.empty((0, 3)),
+                  node_index(np.concatenate(elements)) if elements else np.empty((0, 4), dtype=np.int64))
+    m.node_sets['all'] = np.arange(m.n_nodes)
+
+    for name, parts in nsets.items():
+        m.node_sets[name] = _set_indices('NSET', name, node_index, np.concatenate(parts))
+    for name, parts in elsets.items():
+        m.element_sets[name] = _set_indices('ELSET', name, element_index, np.concatenate(parts))
+        if name not in m.node_sets:
+            m.node_sets[name] = np.unique(m.connectivity[m.element_sets[name]])
+    return _remove_unused_nodes(m)
+
+
+def _remove_unused_nodes(m: mesh.Mesh) -> mesh.Mesh:
+    # Knoten ohne Element (nur an uebersprungenen Elementtypen oder frei) haetten keine Steifigkeit -> K singulaer
+    used = np.zeros(m.n_nodes, dtype=bool)
+    used[m.connectivity.ravel()] = True
+    if used.all():
+        return m
+    warnings.warn(f"Removed {m.n_nodes - int(used.sum())} nodes that are not used by any 4-node shell element")
+    new_index = np.cumsum(used) - 1
+    compact = mesh.Mesh(m.coords[used], new_index[m.connectivity], element_sets=m.element_sets)
+    for name, ids in m.node_sets.items():
+        compact.node_sets[name] = new_index[ids[used[ids]]]
+    compact.node_sets['all'] = np.arange(compact.n_nodes)
+    return compact
+
+
+def read(path: str, block_size: int = BLOCK_SIZE) -> mesh.Mesh:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.msh':
+        return read_gmsh(path, block_size)
+    if extension == '.inp':
+        return read_abaqus(path, block_size)
+    raise ValueError(f"Unknown mesh file type '{extension}', expected .msh or .inp")
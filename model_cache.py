@@ -0,0 +1,148 @@
+# Persistent cache of an assembled Structure in one uncompressed NPZ file, loaded memory-mapped
+import hashlib
+import struct
+import zipfile
+
+import numpy as np
+import scipy.sparse as sp
+
+FORMAT_VERSION = 1
+
+
+def _digest(parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(str((part.dtype.str, part.shape)).encode())
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(repr(part).encode())
+    return h.hexdigest()
+
+
+def stiffness_hash(structure) -> str:
+    # alles, wovon Elementmatrizen, DOF-Nummerierung und K abhaengen
+    structure._list_nodes()
+    rows = structure._node_index
+    _, lam_index = structure._laminate_table()
+    return _digest([FORMAT_VERSION, structure.node_store.coords[rows], structure.get_connectivity(),
+                    structure.node_store.free[rows], lam_index, structure._built_layup_keys,
+                    structure._reference_systems(), structure._quadrature_rules(), structure.dof_ordering])
+
+
+def forces_hash(structure) -> str:
+    return _digest([structure.node_store.forces[structure._node_index]])
+
+
+def save(structure, path: str, factors: bool = False) -> None:
+    """Write nodes, connectivity, DOF map, element matrices, K, F and u.
+
+    factors=True also stores SuperLU factors, so a later load can solve
+    without factorizing. The file is written uncompressed so that load()
+    can memory-map every array.
+    """
+    if structure._global_stiffness_matrix is None:
+        structure.assemble_global_stiffness_matrix()
+    K = sp.csr_matrix(structure._global_stiffness_matrix)
+    rows = structure._node_index
+    store = structure.node_store
+
+    arrays = {
+        'format_version': np.array(FORMAT_VERSION),
+        'stiffness_hash': np.array(stiffness_hash(structure)),
+        'forces_hash': np.array(forces_hash(structure)),
+        'coords': store.coords[rows], 'free': store.free[rows], 'forces': store.forces[rows],
+        'node_dofs': store.dofs[rows], 'connectivity': structure.get_connectivity(),
+        'node_permutation': structure.node_permutation, 'element_dofs': structure._element_dofs,
+        'numberofdofs': np.array(structure._numberofdofs),
+        'element_stiffness_local': structure._element_stiffness_local,
+        'element_stiffness_global': structure._element_stiffness_global,
+        'K_data': K.data, 'K_indices': K.indices, 'K_indptr': K.indptr,
+    }
+    if structure._global_force_vector is not None:
+        arrays['force_vector'] = structure._global_force_vector
+    if structure._displacements is not None:
+        arrays['displacements'] = structure._displacements
+    if factors and structure.solver.is_factorized() and hasattr(structure.solver, 'export_factors'):
+        exported = structure.solver.export_factors()
+        if exported is not None:
+            arrays.update({'factor_' + k: v for k, v in exported.items()})
+    np.savez(path, **arrays)
+
+
+def open_npz(path: str, mmap: bool = True) -> dict:
+    # Arrays eines unkomprimierten NPZ direkt aus der Datei mappen (copy-on-write, Datei bleibt unveraendert)
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as fh:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if not mmap or info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+
+            # lokaler Zip-Header: 30 Byte fest, danach Dateiname und Extrafeld
+            fh.seek(info.header_offset)
+            name_length, extra_length = struct.unpack('<HH', fh.read(30)[26:30])
+            fh.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(fh)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fh)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fh)
+
+            if len(shape) == 0 or np.prod(shape) == 0 or dtype.hasobject:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+            else:
+                # als normales ndarray weiterreichen, memmap-Indexierung ist pro Zugriff deutlich langsamer
+                arrays[name] = np.memmap(path, dtype=dtype, mode='c', offset=fh.tell(), shape=shape,
+                                         order='F' if fortran_order else 'C').view(np.ndarray)
+    return arrays
+
+
+def load(structure, path: str, mmap: bool = True) -> bool:
+    """Restore the state written by save() into a structure built from the same model.
+
+    Returns False without changing anything if the file is missing or was
+    written for a different model (content hash mismatch).
+    """
+    try:
+        arrays = open_npz(path, mmap)
+    except FileNotFoundError:
+        return False
+    if int(arrays['format_version']) != FORMAT_VERSION or str(arrays['stiffness_hash']) != stiffness_hash(structure):
+        return False
+
+    rows = structure._node_index
+    store = structure.node_store
+    store.dofs[rows] = arrays['node_dofs']
+    structure.node_permutation = np.asarray(arrays['node_permutation'])
+    structure._numberofdofs = int(arrays['numberofdofs'])
+    structure._element_dofs = arrays['element_dofs']
+    node_dofs = structure.node_dofs()
+    structure.dof_permutation = node_dofs[node_dofs != -1]
+    structure._built_free = store.free[rows].copy()
+
+    structure._element_stiffness_local = arrays['element_stiffness_local']
+    structure._element_stiffness_global = arrays['element_stiffness_global']
+    for i, e in enumerate(structure.elements):
+        e._dofNumbers = structure._element_dofs[i]
+        e.bind_stiffness(structure._element_stiffness_local[i], structure._element_stiffness_global[i])
+    structure._record_built_elements()
+    structure._forced_dirty = np.array([], dtype=np.int64)
+
+    n = structure._numberofdofs
+    structure.invalidate_stiffness()
+    structure._global_stiffness_matrix = sp.csr_matrix(
+        (arrays['K_data'], arrays['K_indices'], arrays['K_indptr']), shape=(n, n), copy=False)
+    # Lasten koennen sich unabhaengig von K geaendert haben
+    forces_current = str(arrays['forces_hash']) == forces_hash(structure)
+    structure._global_force_vector = arrays['force_vector'] if forces_current and 'force_vector' in arrays else None
+
+    if 'factor_perm_r' in arrays and hasattr(structure.solver, 'import_factors'):
+        structure.solver.import_factors({k[len('factor_'):]: v for k, v in arrays.items() if k.startswith('factor_')})
+    if 'displacements' in arrays and forces_current:
+        structure._displacements = arrays['displacements']
+        structure._set_nodal_displacements()
+    return True
@@ -5,16 +5,134 @@ import constraints
 
 from itertools import count
 
+# Skalierung der Verschiebung fuer die verformte Darstellung
+DISPLACEMENT_SCALE = 10
+
+
+class NodeSet:
+    """Structure-of-arrays storage for node data.
+
+    Row i holds coordinates (3), free-DOF mask (5), nodal forces (5),
+    displacements (5), global DOF numbers (5, -1 = locked) and the displaced
+    position (3) of node i. Storage grows by doubling, so views returned by
+    the properties are only valid until the next add().
+    """
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self._allocate(max(capacity, 1))
+
+    def _allocate(self, capacity: int) -> None:
+        old = getattr(self, '_coords', None)
+        new = {
+            '_coords': np.zeros((capacity, 3), dtype=float),
+            '_free': np.ones((capacity, 5), dtype=bool),
+            '_forces': np.zeros((capacity, 5), dtype=float),
+            '_displacements': np.zeros((capacity, 5), dtype=float),
+            '_dofs': np.zeros((capacity, 5), dtype=int),
+            '_displaced': np.zeros((capacity, 3), dtype=float),
+        }
+        for name, array in new.items():
+            if old is not None:
+                array[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, array)
+
+    def add(self, coords: np.ndarray) -> np.ndarray:
+        # (m, 3) Koordinaten anhaengen, liefert die Zeilenindizes
+        coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+        start, stop = self.size, self.size + coords.shape[0]
+        if stop > self._coords.shape[0]:
+            self._allocate(max(stop, 2 * self._coords.shape[0]))
+        self._coords[start:stop] = coords
+        self.size = stop
+        return np.arange(start, stop)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def coords(self) -> np.ndarray:
+        return self._coords[:self.size]
+
+    @property
+    def free(self) -> np.ndarray:
+        return self._free[:self.size]
+
+    @property
+    def forces(self) -> np.ndarray:
+        return self._forces[:self.size]
+
+    @property
+    def displacements(self) -> np.ndarray:
+        return self._displacements[:self.size]
+
+    @property
+    def dofs(self) -> np.ndarray:
+        return self._dofs[:self.size]
+
+    @property
+    def displaced(self) -> np.ndarray:
+        return self._displaced[:self.size]
+
+
 class Node:
+    """Lightweight view on one row of a NodeSet."""
     _node_ids = count(0)
-    def __init__(self, x1: float, x2: float, x3: float) -> None:
+    # gemeinsamer Speicher fuer alle Knoten ohne eigenen NodeSet
+    store = NodeSet()
+
+    def __init__(self, x1: float, x2: float, x3: float, store: NodeSet = None) -> None:
         self.id = next(self._node_ids)
-        self.node_position = np.array([x1, x2, x3], dtype=float)
-        self._dofNumbers = np.zeros(5, dtype=int)  # jetzt 5 DOFs
-        self.force = forces.Force(0, 0, 0, 0, 0)  # Force-Klasse anpassen
-        self.constraints = constraints.Constraint(True, True, True, True, True)  # jetzt 5 DOFs
-        self._displacement = np.zeros(5, dtype=float)
-        self.displaced= np.zeros(3, dtype=float)
+        self._store = Node.store if store is None else store
+        self._index = int(self._store.add([x1, x2, x3])[0])
+
+    @classmethod
+    def from_store(cls, store: NodeSet, index: int) -> 'Node':
+        # View auf eine bereits vorhandene Zeile, z.B. aus NodeSet.add fuer viele Knoten
+        n = cls.__new__(cls)
+        n.id = next(cls._node_ids)
+        n._store = store
+        n._index = int(index)
+        return n
+
+    @property
+    def node_position(self) -> np.ndarray:
+        return self._store._coords[self._index]
+
+    @node_position.setter
+    def node_position(self, position) -> None:
+        self._store._coords[self._index] = position
+
+    @property
+    def _dofNumbers(self) -> np.ndarray:
+        return self._store._dofs[self._index]
+
+    @property
+    def force(self) -> forces.Force:
+        return forces.Force.from_view(self._store._forces[self._index])
+
+    @force.setter
+    def force(self, force: forces.Force) -> None:
+        self._store._forces[self._index] = force.get_components()
+
+    @property
+    def constraints(self) -> constraints.Constraint:
+        return constraints.Constraint.from_view(self._store._free[self._index])
+
+    @constraints.setter
+    def constraints(self, constraint: 'constraints.Constraint') -> None:
+        self._store._free[self._index] = constraint.get_constraints()
+
+    @property
+    def _displacement(self) -> np.ndarray:
+        return self._store._displacements[self._index]
+
+    @property
+    def displaced(self) -> np.ndarray:
+        return self._store._displaced[self._index]
+
+    @displaced.setter
+    def displaced(self, position) -> None:
+        self._store._displaced[self._index] = position
 
     def print(self) -> None:
         print(self.node_position)
@@ -50,8 +168,8 @@ class Node:
     def get_displacement(self):
         return self._displacement
 
-    def calculate_new_position(self):
-        self.displaced = self.node_position + self._displacement[0:3] * 10
+    def calculate_new_position(self, scale: float = DISPLACEMENT_SCALE):
+        self.displaced = self.node_position + self._displacement[0:3] * scale
 
 if __name__ == "__main__":
     node_1 = Node(0, 0, 0)
@@ -0,0 +1,70 @@
+# Quadrature rules on the reference quad [-1, 1]^2 with precomputed shape function tables
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+
+def shape_functions(points: np.ndarray):
+    # (g, 2) natuerliche Koordinaten -> N (g, 4) und [dN/dxi, dN/deta] (g, 4, 2), Knoten wie Element._shape_function
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    xi, eta = points[:, 0:1], points[:, 1:2]
+    N = 0.25 * np.hstack([(1 - xi) * (1 - eta), (1 + xi) * (1 - eta), (1 + xi) * (1 + eta), (1 - xi) * (1 + eta)])
+    dN_dxi = 0.25 * np.hstack([-(1 - eta), (1 - eta), (1 + eta), -(1 + eta)])
+    dN_deta = 0.25 * np.hstack([-(1 - xi), -(1 + xi), (1 + xi), (1 - xi)])
+    return N, np.stack([dN_dxi, dN_deta], axis=-1)
+
+
+@dataclass(frozen=True)
+class QuadratureRule:
+    """Gauss rule with N and dN tables evaluated once at its points.
+
+    reduced: rule for the stiffness terms that couple to the shear strains
+    gamma_xy and kappa_xy (selective reduced integration), None for a plain
+    rule.
+    """
+    name: str
+    points: np.ndarray     # (g, 2)
+    weights: np.ndarray    # (g,)
+    N: np.ndarray          # (g, 4)
+    dN: np.ndarray         # (g, 4, 2)
+    reduced: Optional['QuadratureRule'] = None
+
+    @property
+    def n_points(self) -> int:
+        return self.points.shape[0]
+
+
+def gauss_rule(name: str, order: int, reduced: QuadratureRule = None) -> QuadratureRule:
+    # Tensorprodukt-Gaussregel; Reihenfolge bei 2x2 wie die Knoten (gegen den Uhrzeigersinn ab (-,-))
+    x, w = np.polynomial.legendre.leggauss(order)
+    if order == 2:
+        index = [(0, 0), (1, 0), (1, 1), (0, 1)]
+    else:
+        index = [(i, j) for j in range(order) for i in range(order)]
+    points = np.array([(x[i], x[j]) for i, j in index])
+    weights = np.array([w[i] * w[j] for i, j in index])
+    N, dN = shape_functions(points)
+    for table in (points, weights, N, dN):
+        table.flags.writeable = False
+    return QuadratureRule(name, points, weights, np.ascontiguousarray(N), np.ascontiguousarray(dN), reduced)
+
+
+RULES = {}
+RULES['1x1'] = gauss_rule('1x1', 1)
+RULES['2x2'] = gauss_rule('2x2', 2)
+RULES['3x3'] = gauss_rule('3x3', 3)
+# Normaldehnungen/Kruemmungen voll, Schubanteile (gamma_xy, kappa_xy) reduziert gegen Schublocking
+RULES['selective'] = gauss_rule('selective', 2, reduced=RULES['1x1'])
+
+# Zeilen von Bc, deren Steifigkeitsanteile bei selektiver Integration reduziert werden
+SHEAR_ROWS = np.array([2, 5])
+
+
+def get_rule(rule) -> QuadratureRule:
+    if isinstance(rule, QuadratureRule):
+        return rule
+    try:
+        return RULES[rule]
+    except KeyError:
+        raise ValueError(f"Unknown quadrature rule '{rule}', expected one of {tuple(RULES)}") from None
@@ -0,0 +1,64 @@
+# Fill-reducing node orderings used before DOF numbering
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+
+def node_adjacency(connectivity: np.ndarray, n_nodes: int) -> sp.csr_matrix:
+    # (n_elem, nodes_per_elem) lokale Knotenindizes -> symmetrischer Knotengraph
+    connectivity = np.asarray(connectivity, dtype=np.int64)
+    k = connectivity.shape[1]
+    rows = np.repeat(connectivity, k, axis=1).ravel()
+    cols = np.tile(connectivity, (1, k)).ravel()
+    A = sp.coo_matrix((np.ones(rows.size, dtype=np.int8), (rows, cols)), shape=(n_nodes, n_nodes)).tocsr()
+    A.data[:] = 1
+    return A
+
+
+def rcm(adjacency: sp.csr_matrix) -> np.ndarray:
+    return np.asarray(reverse_cuthill_mckee(adjacency, symmetric_mode=True), dtype=np.int64)
+
+
+def nested_dissection(adjacency: sp.csr_matrix, coords: np.ndarray, leaf_size: int = 64) -> np.ndarray:
+    """Geometric nested dissection.
+
+    Recursively bisects the node set at the median of its longest extent,
+    takes the nodes on one side that touch the other side as separator and
+    numbers both halves before their separator.
+    """
+    coords = np.asarray(coords, dtype=float)
+    order = []
+    stack = [(np.arange(adjacency.shape[0]), False)]
+
+    # iterativ statt rekursiv; (idx, True) bedeutet: Separator direkt anhaengen
+    while stack:
+        idx, is_separator = stack.pop()
+        if is_separator or idx.size <= leaf_size:
+            order.append(idx)
+            continue
+
+        sub = coords[idx]
+        axis = np.argmax(sub.max(axis=0) - sub.min(axis=0))
+        split = np.median(sub[:, axis])
+        right_mask = sub[:, axis] > split
+        if right_mask.all() or not right_mask.any():
+            order.append(idx)
+            continue
+
+        in_right = np.zeros(adjacency.shape[0], dtype=bool)
+        in_right[idx[right_mask]] = True
+        left = idx[~right_mask]
+        touches_right = (adjacency[left] @ in_right) > 0
+        separator, left = left[touches_right], left[~touches_right]
+
+        # Stack: zuletzt gepusht wird zuerst nummeriert
+        stack.append((separator, True))
+        stack.append((idx[right_mask], False))
+        stack.append((left, False))
+
+    return np.concatenate(order) if order else np.array([], dtype=np.int64)
+
+
+def bandwidth(K) -> int:
+    K = sp.coo_matrix(K)
+    return int(np.abs(K.row - K.col).max()) if K.nnz else 0
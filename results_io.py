@@ -0,0 +1,235 @@
+# Binary result export (VTU + PVD collection, XDMF + HDF5) for post-processing in ParaView
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+import failure
+
+VTK_QUAD = 9
+FORMATS = {'.vtu': 'vtu', '.pvd': 'vtu', '.xdmf': 'xdmf', '.h5': 'xdmf'}
+
+
+def result_steps(structure, failure_criterion: str = None, load_cases: bool = True):
+    """Yield (name, point_data, cell_data) for the current solution and every load case.
+
+    point_data: displacement (n, 3), rotation (n, 2), strain (n, 6) at the
+    nodes. cell_data: strain (n_elem, 6), ply stresses per ply
+    (stress_ply<k>, [sigma_1, sigma_2, tau_12] at the ply mid-plane) and,
+    with failure_criterion, reserve_factor, failure_index and critical_ply.
+    Steps are computed one after another, so only one step is held in memory.
+    """
+    displacements = []
+    if structure._displacements is not None:
+        displacements.append(('solution', structure.node_store.displacements[structure._node_index]))
+    if load_cases and structure.load_case_displacements is not None:
+        displacements += list(zip(structure.load_case_names, structure.load_case_displacements))
+
+    structure._laminate_table()
+    for name, u in displacements:
+        strains = structure.gauss_strains(u)
+        point_data = {'displacement': u[:, :3], 'rotation': u[:, 3:5], 'strain': structure.strains_to_nodes(strains)}
+        cell_data = {'strain': strains.mean(axis=1)}
+        ply_stresses = failure.element_ply_stresses(strains, structure._laminates, structure._lam_index)
+        for k in range(ply_stresses.shape[1]):
+            cell_data[f'stress_ply{k}'] = ply_stresses[:, k]
+        if failure_criterion:
+            result = failure.evaluate(strains, structure._laminates, structure._lam_index, failure_criterion)
+            cell_data.update(reserve_factor=result.reserve_factor, failure_index=result.failure_index,
+                             critical_ply=result.critical_ply)
+        yield name, point_data, cell_data
+
+
+class VTUWriter:
+    """One binary .vtu file per step plus a .pvd collection that ParaView opens as a time series.
+
+    Files are <stem>_0000.vtu, <stem>_0001.vtu, ... next to <stem>.pvd.
+    Arrays are stored raw in the appended data section and written with one
+    call each. append=True continues the steps of an existing collection.
+    """
+    def __init__(self, path: str, append: bool = False):
+        self.stem = os.path.splitext(path)[0]
+        self.path = self.stem + '.pvd'
+        self.steps = []   # (time, name, file name relativ zur .pvd)
+        if append and os.path.exists(self.path):
+            for dataset in ET.parse(self.path).getroot().iter('DataSet'):
+                self.steps.append((float(dataset.get('timestep')), dataset.get('name', ''), dataset.get('file')))
+
+    def close(self) -> None:
+        # jede Datei ist nach write_step vollstaendig geschrieben
+        pass
+
+    def write_step(self, coords: np.ndarray, connectivity: np.ndarray, point_data: dict, cell_data: dict,
+                   time: float = None, name: str = '') -> str:
+        index = len(self.steps)
+        file_name = f"{os.path.basename(self.stem)}_{index:04d}.vtu"
+        n_cells = connectivity.shape[0]
+        arrays = [('Points', 'Points', np.asarray(coords, dtype='<f8')),
+                  ('Cells', 'connectivity', np.asarray(connectivity, dtype='<i8').ravel()),
+                  ('Cells', 'offsets', 4 * np.arange(1, n_cells + 1, dtype='<i8')),
+                  ('Cells', 'types', np.full(n_cells, VTK_QUAD, dtype='u1'))]
+        arrays += [('PointData', k, v) for k, v in point_data.items()]
+        arrays += [('CellData', k, v) for k, v in cell_data.items()]
+        _write_vtu(os.path.join(os.path.dirname(self.path), file_name), coords.shape[0], n_cells, arrays)
+
+        self.steps.append((float(index if time is None else time), name, file_name))
+        self._write_collection()
+        return file_name
+
+    def _write_collection(self) -> None:
+        # Index nach jedem Schritt neu schreiben, damit er auch bei Abbruch gueltig ist
+        lines = ['<?xml version="1.0"?>',
+                 '<VTKFile type="Collection" version="1.0" byte_order="LittleEndian">', '  <Collection>']
+        lines += [f'    <DataSet timestep="{t!r}" name="{_escape(n)}" part="0" file="{_escape(f)}"/>'
+                  for t, n, f in self.steps]
+        lines += ['  </Collection>', '</VTKFile>', '']
+        with open(self.path, 'w') as fh:
+            fh.write('\n'.join(lines))
+
+
+def _escape(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;')
+
+
+def _vtk_type(dtype) -> str:
+    return {'f': 'Float', 'i': 'Int', 'u': 'UInt'}[dtype.kind] + str(8 * dtype.itemsize)
+
+
+def _write_vtu(path: str, n_points: int, n_cells: int, arrays: list) -> None:
+    # XML-Kopf mit Offsets, danach alle Arrays roh im AppendedData-Block (je UInt64-Laenge + Daten)
+    sections = {'Points': [], 'Cells': [], 'PointData': [], 'CellData': []}
+    blocks = []
+    offset = 0
+    for section, name, values in arrays:
+        values = np.asarray(values)
+        if values.dtype == bool:
+            values = values.astype('u1')
+        values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+        components = values.shape[1] if values.ndim > 1 else 1
+        sections[section].append(f'<DataArray type="{_vtk_type(values.dtype)}" Name="{_escape(name)}" '
+                                 f'NumberOfComponents="{components}" format="appended" offset="{offset}"/>')
+        blocks.append(values)
+        offset += 8 + values.nbytes
+
+    header = ['<?xml version="1.0"?>',
+              '<VTKFile type="UnstructuredGrid" version="1.0" byte_order="LittleEndian" header_type="UInt64">',
+              '  <UnstructuredGrid>', f'    <Piece NumberOfPoints="{n_points}" NumberOfCells="{n_cells}">']
+    for section in ('Points', 'Cells', 'PointData', 'CellData'):
+        header.append(f'      <{section}>')
+        header += ['        ' + line for line in sections[section]]
+        header.append(f'      </{section}>')
+    header += ['    </Piece>', '  </UnstructuredGrid>', '  <AppendedData encoding="raw">']
+
+    with open(path, 'wb') as fh:
+        fh.write(('\n'.join(header) + '\n_').encode())
+        for values in blocks:
+            fh.write(np.uint64(values.nbytes).tobytes())
+            values.tofile(fh)
+        fh.write(b'\n  </AppendedData>\n</VTKFile>\n')
+
+
+class XDMFWriter:
+    """All steps in one HDF5 file, described by an .xdmf temporal collection.
+
+    The mesh is stored once under /mesh, step k under /steps/<k>/point and
+    /steps/<k>/cell. append=True adds steps to an existing file with the
+    same mesh. Requires h5py.
+    """
+    def __init__(self, path: str, append: bool = False):
+        try:
+            import h5py
+        except ImportError:
+            raise ImportError("XDMF output requires h5py, use a .vtu/.pvd file instead") from None
+        stem = os.path.splitext(path)[0]
+        self.path = stem + '.xdmf'
+        self.h5_path = stem + '.h5'
+        self._h5 = h5py.File(self.h5_path, 'a' if append else 'w')
+
+    def close(self) -> None:
+        self._h5.close()
+
+    def write_step(self, coords: np.ndarray, connectivity: np.ndarray, point_data: dict, cell_data: dict,
+                   time: float = None, name: str = '') -> str:
+        h5 = self._h5
+        if 'mesh' not in h5:
+            h5.create_dataset('mesh/coords', data=np.asarray(coords, dtype=float))
+            h5.create_dataset('mesh/connectivity', data=np.asarray(connectivity, dtype=np.int64))
+        elif not (np.array_equal(h5['mesh/coords'][()], coords)
+                  and np.array_equal(h5['mesh/connectivity'][()], connectivity)):
+            # Werte vergleichen, gleiche Form reicht nicht (z.B. verschobene Knoten)
+            raise ValueError(f"Mesh differs from the one stored in {self.h5_path}, cannot append")
+
+        index = len(h5['steps']) if 'steps' in h5 else 0
+        group = h5.create_group(f'steps/{index}')
+        group.attrs['time'] = float(index if time is None else time)
+        group.attrs['name'] = name
+        for center, data in (('point', point_data), ('cell', cell_data)):
+            for key, values in data.items():
+                group.create_dataset(f'{center}/{key}', data=np.asarray(values))
+        h5.flush()
+        self._write_xdmf()
+        return f'{self.h5_path}:/steps/{index}'
+
+    def _write_xdmf(self) -> None:
+        # komplette Beschreibung aus dem HDF5-Inhalt, Anhaengen braucht daher keinen XML-Parser
+        h5 = self._h5
+        h5_name = os.path.basename(self.h5_path)
+        n_cells = h5['mesh/connectivity'].shape[0]
+
+        def item(path):
+            dataset = h5[path]
+            kind = {'f': 'Float', 'i': 'Int', 'u': 'UInt'}[dataset.dtype.kind]
+            dims = ' '.join(str(d) for d in dataset.shape)
+            return (f'<DataItem Dimensions="{dims}" NumberType="{kind}" Precision="{dataset.dtype.itemsize}" '
+                    f'Format="HDF">{h5_name}:/{path}</DataItem>')
+
+        lines = ['<?xml version="1.0"?>', '<Xdmf Version="3.0">', '  <Domain>',
+                 '    <Grid Name="results" GridType="Collection" CollectionType="Temporal">']
+        for index in sorted(h5['steps'], key=int):
+            group = h5['steps'][index]
+            lines += [f'      <Grid Name="{_escape(str(group.attrs["name"]) or index)}" GridType="Uniform">',
+                      f'        <Time Value="{float(group.attrs["time"])!r}"/>',
+                      f'        <Topology TopologyType="Quadrilateral" NumberOfElements="{n_cells}">',
+                      '          ' + item('mesh/connectivity'), '        </Topology>',
+                      '        <Geometry GeometryType="XYZ">', '          ' + item('mesh/coords'), '        </Geometry>']
+            for center, xdmf_center in (('point', 'Node'), ('cell', 'Cell')):
+                for key in group.get(center, {}):
+                    dataset = group[center][key]
+                    components = dataset.shape[1] if dataset.ndim > 1 else 1
+                    kind = {1: 'Scalar', 3: 'Vector'}.get(components, 'Matrix')
+                    lines += [f'        <Attribute Name="{_escape(key)}" AttributeType="{kind}" '
+                              f'Center="{xdmf_center}">',
+                              '          ' + item(f'steps/{index}/{center}/{key}'), '        </Attribute>']
+            lines.append('      </Grid>')
+        lines += ['    </Grid>', '  </Domain>', '</Xdmf>', '']
+        with open(self.path, 'w') as fh:
+            fh.write('\n'.join(lines))
+
+
+def open_writer(path: str, append: bool = False):
+    # Format nach Dateiendung: .vtu/.pvd oder .xdmf/.h5
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown result format '{extension}', expected one of {tuple(FORMATS)}")
+    return VTUWriter(path, append) if FORMATS[extension] == 'vtu' else XDMFWriter(path, append)
+
+
+def write_results(structure, path: str, failure_criterion: str = None, load_cases: bool = True,
+                  append: bool = False, time: float = None) -> list:
+    """Write the solution and all solved load cases of a structure as result steps.
+
+    time: time/load step value of the first written step, following steps
+    count up by one; default is the step index. With append=True the steps
+    are added to an existing result file. Returns the written step names.
+    """
+    writer = open_writer(path, append)
+    coords, connectivity = structure.node_coordinates(), structure.get_connectivity()
+    written = []
+    try:
+        for k, (name, point_data, cell_data) in enumerate(result_steps(structure, failure_criterion, load_cases)):
+            step_time = None if time is None else time + k
+            writer.write_step(coords, connectivity, point_data, cell_data, time=step_time, name=name)
+            written.append(name)
+    finally:
+        writer.close()
+    return written
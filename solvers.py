@@ -0,0 +1,340 @@
+# Solver backends for Structure.solve
+import warnings
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+try:
+    from sksparse.cholmod import cholesky as _cholmod_cholesky
+    from sksparse.cholmod import CholmodNotPositiveDefiniteError
+except ImportError:
+    _cholmod_cholesky = None
+    CholmodNotPositiveDefiniteError = None
+
+
+class DirectSolver:
+    """Sparse direct solver that keeps its factorization between solves.
+
+    method: 'superlu' (SciPy), 'cholmod' (scikit-sparse) or 'auto', which
+    tries a Cholesky factorization first and falls back to SuperLU.
+    permc_spec is passed to SuperLU; 'NATURAL' keeps the ordering from
+    Structure.dof_ordering and factorizes with diagonal pivots only (K is SPD).
+    """
+    _methods = ('auto', 'superlu', 'cholmod')
+
+    def __init__(self, method: str = 'auto', permc_spec: str = 'COLAMD'):
+        if method not in self._methods:
+            raise ValueError(f"Unknown solver method '{method}', expected one of {self._methods}")
+        if method == 'cholmod' and _cholmod_cholesky is None:
+            raise ImportError("method='cholmod' requires scikit-sparse")
+        self.method = method
+        self.permc_spec = permc_spec
+        self.backend = None
+        self.n_factorizations = 0
+        self._factor = None
+
+    def is_factorized(self) -> bool:
+        return self._factor is not None
+
+    def reset(self) -> None:
+        self._factor = None
+        self.backend = None
+
+    def factorize(self, K) -> None:
+        K = sp.csc_matrix(K)
+        self.reset()
+
+        if self.method != 'superlu' and _cholmod_cholesky is not None:
+            try:
+                self._factor = _cholmod_cholesky(K)
+                self.backend = 'cholmod'
+            except CholmodNotPositiveDefiniteError:
+                if self.method == 'cholmod':
+                    raise
+
+        if self._factor is None:
+            if self.permc_spec == 'NATURAL':
+                # Pivotsuche wuerde die Umnummerierung wieder zerstoeren
+                self._factor = spla.splu(K, permc_spec='NATURAL', diag_pivot_thresh=0.0,
+                                         options=dict(SymmetricMode=True))
+            else:
+                self._factor = spla.splu(K, permc_spec=self.permc_spec)
+            self.backend = 'superlu'
+        self.n_factorizations += 1
+
+    def solve(self, rhs: np.ndarray) -> np.ndarray:
+        # rhs darf (ndof,) oder (ndof, ncases) sein
+        if self._factor is None:
+            raise RuntimeError("factorize() must be called before solve()")
+        if self.backend == 'cholmod':
+            return self._factor(rhs)
+        return self._factor.solve(np.asarray(rhs, dtype=float))
+
+    def export_factors(self) -> dict:
+        # L, U und Permutationen einer SuperLU-Faktorisierung als Arrays; CHOLMOD-Faktoren lassen sich nicht exportieren
+        if self.backend != 'superlu':
+            return None
+        if isinstance(self._factor, StoredLU):
+            return self._factor.arrays()
+        L, U = self._factor.L.tocsr(), self._factor.U.tocsr()
+        return {'L_data': L.data, 'L_indices': L.indices, 'L_indptr': L.indptr,
+                'U_data': U.data, 'U_indices': U.indices, 'U_indptr': U.indptr,
+                'perm_r': self._factor.perm_r, 'perm_c': self._factor.perm_c}
+
+    def import_factors(self, factors: dict) -> None:
+        # Gegenstueck zu export_factors, loest ueber Dreieckssysteme ohne neue Faktorisierung
+        self._factor = StoredLU(factors)
+        self.backend = 'superlu'
+
+
+class StoredLU:
+    # Pr K Pc = L U aus gespeicherten Arrays, gleiche Schnittstelle wie SuperLU.solve
+    def __init__(self, factors: dict):
+        n = factors['perm_r'].size
+        self._arrays = factors
+        self.L = sp.csr_matrix((factors['L_data'], factors['L_indices'], factors['L_indptr']), shape=(n, n))
+        self.U = sp.csr_matrix((factors['U_data'], factors['U_indices'], factors['U_indptr']), shape=(n, n))
+        self.perm_r = factors['perm_r']
+        self.perm_c = factors['perm_c']
+
+    def arrays(self) -> dict:
+        return self._arrays
+
+    def solve(self, rhs: np.ndarray) -> np.ndarray:
+        # ganzzahlige Lastvektoren nicht abschneiden
+        y = np.empty(np.shape(rhs), dtype=np.result_type(rhs, float))
+        y[self.perm_r] = rhs
+        y = spla.spsolve_triangular(self.L, y, lower=True, unit_diagonal=True)
+        y = spla.spsolve_triangular(self.U, y, lower=False)
+        return y[self.perm_c]
+
+
+class PCGSolver:
+    """Matrix-free preconditioned conjugate gradient solver.
+
+    K @ u is applied element by element from the (n_elem, 20, 20) element
+    stiffness array, the global matrix is never formed.
+    preconditioner: 'jacobi', 'block_jacobi' (5x5 per node) or None.
+    After solve(), history holds the relative residuals and iterations the
+    iteration count; for a multi-column rhs both are lists with one entry per
+    column and converged is True only if every column converged.
+    """
+    matrix_free = True
+    _preconditioners = (None, 'jacobi', 'block_jacobi')
+
+    def __init__(self, preconditioner: str = 'block_jacobi', tol: float = 1e-8, maxiter: int = None):
+        if preconditioner not in self._preconditioners:
+            raise ValueError(f"Unknown preconditioner '{preconditioner}', expected one of {self._preconditioners}")
+        self.preconditioner = preconditioner
+        self.tol = tol
+        self.maxiter = maxiter
+        self.history = []
+        self.iterations = 0
+        self.converged = None
+        self._Ke = None
+
+    def is_factorized(self) -> bool:
+        return self._Ke is not None
+
+    def reset(self) -> None:
+        self._Ke = None
+
+    def setup(self, element_matrices: np.ndarray, element_dofs: np.ndarray, ndof: int,
+              node_dofs: np.ndarray) -> None:
+        # element_dofs (n_elem, 20) und node_dofs (n_nodes, 5), gesperrt = -1
+        self._Ke = np.asarray(element_matrices, dtype=float)
+        self._ndof = ndof
+        # -1 zeigt auf einen angehaengten Nulleintrag
+        self._dofs = np.where(element_dofs == -1, ndof, element_dofs)
+        self._dofs_flat = self._dofs.ravel()
+        self._node_dofs = np.where(node_dofs == -1, ndof, node_dofs)
+
+        diagonal = np.diagonal(self._Ke, axis1=1, axis2=2).ravel()
+        diag = np.bincount(self._dofs_flat, weights=diagonal, minlength=ndof + 1)[:ndof]
+        # DOFs ohne Steifigkeit (z.B. w ohne Schub) nicht durch 0 teilen
+        diag[diag == 0.0] = 1.0
+        self._inv_diag = 1.0 / diag
+
+        if self.preconditioner == 'block_jacobi':
+            self._setup_block_jacobi(node_dofs)
+
+    def _setup_block_jacobi(self, node_dofs: np.ndarray) -> None:
+        n_nodes = node_dofs.shape[0]
+        # Knotenindex je Elementknoten ueber die erste DOF-Nummer jeder 5er-Gruppe finden
+        blocks = np.zeros((n_nodes + 1, 5, 5))
+        lookup = np.full(self._ndof + 1, n_nodes)
+        lookup[self._node_dofs.ravel()] = np.repeat(np.arange(n_nodes), 5)
+        lookup[self._ndof] = n_nodes
+
+        for a in range(4):
+            Kaa = self._Ke[:, 5 * a:5 * a + 5, 5 * a:5 * a + 5]
+            node_dofs_a = self._dofs[:, 5 * a:5 * a + 5]
+            # kleinste freie DOF identifiziert den Knoten, ganz gesperrte Knoten -> Dummy
+            node_index = lookup[node_dofs_a.min(axis=1)]
+            np.add.at(blocks, node_index, Kaa)
+        blocks = blocks[:n_nodes]
+
+        # gesperrte oder steifigkeitslose DOFs als Einheitszeile/-spalte
+        idle = (node_dofs == -1) | (np.abs(np.diagonal(blocks, axis1=1, axis2=2)) == 0.0)
+        blocks[np.repeat(idle[:, :, None], 5, axis=2)] = 0.0
+        blocks[np.repeat(idle[:, None, :], 5, axis=1)] = 0.0
+        eye = np.broadcast_to(np.eye(5, dtype=bool), blocks.shape)
+        blocks[eye & np.repeat(idle[:, :, None], 5, axis=2)] = 1.0
+        self._inv_blocks = np.linalg.inv(blocks)
+
+    def matvec(self, u: np.ndarray) -> np.ndarray:
+        u_ext = np.append(u, 0.0)
+        f_elem = np.matmul(self._Ke, u_ext[self._dofs][:, :, None])[:, :, 0]
+        return np.bincount(self._dofs_flat, weights=f_elem.ravel(), minlength=self._ndof + 1)[:self._ndof]
+
+    def _apply_preconditioner(self, r: np.ndarray) -> np.ndarray:
+        if self.preconditioner is None:
+            return r.copy()
+        if self.preconditioner == 'jacobi':
+            return self._inv_diag * r
+
+        r_ext = np.append(r, 0.0)
+        z_nodes = np.matmul(self._inv_blocks, r_ext[self._node_dofs][:, :, None])[:, :, 0]
+        z = np.zeros(self._ndof + 1)
+        z[self._node_dofs.ravel()] = z_nodes.ravel()
+        return z[:self._ndof]
+
+    def solve(self, rhs: np.ndarray, x0: np.ndarray = None) -> np.ndarray:
+        if self._Ke is None:
+            raise RuntimeError("setup() must be called before solve()")
+        rhs = np.asarray(rhs, dtype=float)
+        if rhs.ndim == 2:
+            x0 = np.zeros_like(rhs) if x0 is None else x0
+            columns, history, iterations, converged = [], [], [], []
+            for k in range(rhs.shape[1]):
+                columns.append(self._solve_single(rhs[:, k], x0[:, k]))
+                # Verlauf je Spalte sammeln, sonst bliebe nur die letzte Spalte stehen
+                history.append(self.history)
+                iterations.append(self.iterations)
+                converged.append(self.converged)
+            self.history, self.iterations, self.converged = history, iterations, all(converged)
+            return np.column_stack(columns)
+        return self._solve_single(rhs, x0)
+
+    def _solve_single(self, b: np.ndarray, x0: np.ndarray = None) -> np.ndarray:
+        maxiter = self.maxiter if self.maxiter is not None else 10 * self._ndof
+        x = np.zeros(self._ndof) if x0 is None else np.array(x0, dtype=float)
+        b_norm = np.linalg.norm(b)
+        self.history = []
+        self.iterations = 0
+        if b_norm == 0.0:
+            self.converged = True
+            return np.zeros(self._ndof)
+
+        r = b - self.matvec(x)
+        z = self._apply_preconditioner(r)
+        p = z.copy()
+        rz = r @ z
+        self.history.append(np.linalg.norm(r) / b_norm)
+
+        while self.history[-1] > self.tol and self.iterations < maxiter:
+            Ap = self.matvec(p)
+            alpha = rz / (p @ Ap)
+            x += alpha * p
+            r -= alpha * Ap
+            self.iterations += 1
+            self.history.append(np.linalg.norm(r) / b_norm)
+
+            z = self._apply_preconditioner(r)
+            rz_new = r @ z
+            p = z + (rz_new / rz) * p
+            rz = rz_new
+
+        self.converged = self.history[-1] <= self.tol
+        if not self.converged:
+            warnings.warn(f"PCG did not converge: residual {self.history[-1]:.3e} after {self.iterations} iterations")
+        return x
+
+
+class LowRankUpdate:
+    """Re-solve a modified system with the factors of an earlier one.
+
+    Stiffness changes dK on a few DOFs are handled with the
+    Sherman-Morrison-Woodbury identity, newly locked DOFs (u_d = 0) with a
+    Lagrange/Schur-complement correction. Each update costs one multi-RHS
+    solve with the base factors for the touched DOFs; rank() tells when a
+    refactorization is cheaper.
+    """
+    def __init__(self, base_solver: DirectSolver, ndof: int):
+        self.base = base_solver
+        self.ndof = ndof
+        self._dK = sp.csr_matrix((ndof, ndof))
+        self._locked = np.array([], dtype=np.int64)
+        self._prepared = None
+
+    def add_stiffness(self, element_dofs: np.ndarray, blocks: np.ndarray) -> None:
+        # (m, 20) DOFs in Basisnummerierung (-1 = gesperrt) und (m, 20, 20) Steifigkeitsdifferenzen
+        rows = np.repeat(element_dofs, 20, axis=1)
+        cols = np.tile(element_dofs, (1, 20))
+        mask = (rows != -1) & (cols != -1)
+        self._dK = self._dK + sp.csr_matrix((blocks.reshape(-1, 400)[mask], (rows[mask], cols[mask])),
+                                            shape=(self.ndof, self.ndof))
+        self._prepared = None
+
+    def set_locked(self, dofs: np.ndarray) -> None:
+        # alle aktuell zusaetzlich gesperrten DOFs; wieder freigegebene fallen damit aus der Korrektur heraus
+        self._locked = np.unique(np.asarray(dofs, dtype=np.int64))
+        self._prepared = None
+
+    def _touched(self) -> np.ndarray:
+        dK = self._dK.tocoo()
+        return np.unique(np.concatenate([dK.row, dK.col]).astype(np.int64))
+
+    def rank(self) -> int:
+        return self._touched().size + self._locked.size
+
+    def has_updates(self) -> bool:
+        return self._dK.nnz > 0 or self._locked.size > 0
+
+    def _prepare(self) -> None:
+        U = self._touched()
+        W = S_inv_C = None
+        if U.size:
+            # (K + E C E^T)^-1 = K^-1 - K^-1 E (I + C S)^-1 C E^T K^-1,  S = E^T K^-1 E
+            C = self._dK[U][:, U].toarray()
+            W = self._base_solve(_unit_columns(self.ndof, U))
+            S = W[U]
+            S_inv_C = np.linalg.solve(np.eye(U.size) + C @ S, C)
+
+        self._prepared = (U, W, S_inv_C, None, None)
+        L = self._locked
+        Z = G = None
+        if L.size:
+            # u_L = 0 ueber Schur-Komplement G = E_L^T A^-1 E_L mit dem bereits aktualisierten A^-1
+            Z = self._solve_updated(_unit_columns(self.ndof, L))
+            G = Z[L]
+        self._prepared = (U, W, S_inv_C, Z, G)
+
+    def _base_solve(self, rhs: np.ndarray) -> np.ndarray:
+        return np.asarray(self.base.solve(rhs)).reshape(rhs.shape)
+
+    def _solve_updated(self, rhs: np.ndarray) -> np.ndarray:
+        U, W, S_inv_C, _, _ = self._prepared
+        x = self._base_solve(rhs)
+        if U.size:
+            x = x - W @ (S_inv_C @ x[U])
+        return x
+
+    def solve(self, rhs: np.ndarray) -> np.ndarray:
+        if self._prepared is None:
+            self._prepare()
+        rhs = np.asarray(rhs, dtype=float)
+        y = self._solve_updated(rhs)
+        _, _, _, Z, G = self._prepared
+        L = self._locked
+        if L.size:
+            y = y - Z @ np.linalg.solve(G, y[L])
+            y[L] = 0.0
+        return y
+
+
+def _unit_columns(n: int, dofs: np.ndarray) -> np.ndarray:
+    E = np.zeros((n, dofs.size))
+    E[dofs, np.arange(dofs.size)] = 1.0
+    return E
@@ -0,0 +1,119 @@
+# Spatial index over node coordinates (selection, coincident nodes, point location)
+import numpy as np
+import scipy.sparse as sp
+
+import quadrature
+
+
+class SpatialIndex:
+    """KD-tree over node coordinates with optional element connectivity.
+
+    All queries take an absolute tolerance and return node indices into the
+    coordinate array the index was built from.
+    """
+    def __init__(self, coords: np.ndarray, connectivity: np.ndarray = None):
+        # scipy.spatial erst beim Aufbau des Index laden, haelt den Import von structure schlank
+        from scipy.spatial import cKDTree
+        self.coords = np.asarray(coords, dtype=float)
+        self.tree = cKDTree(self.coords)
+        self.connectivity = None if connectivity is None else np.asarray(connectivity, dtype=np.int64)
+        self._node_elements = None
+        self._max_element_size = None
+        self._axis_order = None
+        self._axis_values = None
+
+    def nearest(self, points: np.ndarray, k: int = 1):
+        # liefert (Abstand, Knotenindex)
+        return self.tree.query(np.asarray(points, dtype=float), k=k)
+
+    def in_sphere(self, center, radius: float, tol: float = 1e-9) -> np.ndarray:
+        return np.sort(np.asarray(self.tree.query_ball_point(np.asarray(center, dtype=float), radius + tol), dtype=np.int64))
+
+    def in_box(self, lower, upper, tol: float = 1e-9) -> np.ndarray:
+        lower = np.asarray(lower, dtype=float) - tol
+        upper = np.asarray(upper, dtype=float) + tol
+        if self._axis_order is None:
+            self._axis_order = [np.argsort(self.coords[:, a], kind='stable') for a in range(3)]
+            self._axis_values = [self.coords[order, a] for a, order in enumerate(self._axis_order)]
+
+        # Kandidaten aus der Achse mit dem schmalsten Bereich (binaere Suche), danach exakt filtern
+        bounds = [(np.searchsorted(v, lower[a], 'left'), np.searchsorted(v, upper[a], 'right'))
+                  for a, v in enumerate(self._axis_values)]
+        a = int(np.argmin([hi - lo for lo, hi in bounds]))
+        candidates = self._axis_order[a][bounds[a][0]:bounds[a][1]]
+        c = self.coords[candidates]
+        inside = np.all((c >= lower) & (c <= upper), axis=1)
+        return np.sort(candidates[inside])
+
+    def on_plane(self, point, normal, tol: float = 1e-9) -> np.ndarray:
+        point = np.asarray(point, dtype=float)
+        normal = np.asarray(normal, dtype=float)
+        normal = normal / np.linalg.norm(normal)
+
+        axis = np.flatnonzero(np.abs(normal) > 1.0 - 1e-12)
+        if axis.size == 1:
+            # achsparallele Ebene: Box-Abfrage ueber den Baum
+            lower = np.full(3, -np.inf)
+            upper = np.full(3, np.inf)
+            lower[axis] = upper[axis] = point[axis]
+            return self.in_box(lower, upper, tol)
+        return np.flatnonzero(np.abs((self.coords - point) @ normal) <= tol)
+
+    def coincident_groups(self, tol: float = 1e-9) -> np.ndarray:
+        # representative[i]: kleinster Knotenindex der Gruppe, in der Knoten i liegt
+        n = self.coords.shape[0]
+        pairs = self.tree.query_pairs(tol, output_type='ndarray')
+        graph = sp.coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+        from scipy.sparse.csgraph import connected_components
+        _, labels = connected_components(graph, directed=False)
+        representative = np.full(labels.max() + 1 if n else 0, n, dtype=np.int64)
+        np.minimum.at(representative, labels, np.arange(n))
+        return representative[labels]
+
+    def _element_lookup(self):
+        if self._node_elements is None:
+            conn = self.connectivity
+            n_elem = conn.shape[0]
+            self._node_elements = sp.csr_matrix(
+                (np.ones(conn.size, dtype=np.int8), (conn.ravel(), np.repeat(np.arange(n_elem), conn.shape[1]))),
+                shape=(self.coords.shape[0], n_elem))
+            c = self.coords[conn]
+            self._max_element_size = np.max(np.linalg.norm(c[:, :, None, :] - c[:, None, :, :], axis=-1))
+        return self._node_elements
+
+    def locate(self, point, tol: float = 1e-6, max_iter: int = 20):
+        """Element containing `point` and its natural coordinates.
+
+        Returns (element index, xi, eta) or None. Candidates are all elements
+        with a node within the largest element diameter of the point.
+        """
+        if self.connectivity is None:
+            raise ValueError("locate() needs the element connectivity")
+        point = np.asarray(point, dtype=float)
+        node_elements = self._element_lookup()
+        near = self.tree.query_ball_point(point, self._max_element_size + tol)
+        candidates = np.unique(node_elements[near].indices)
+        if candidates.size == 0:
+            return None
+
+        # Gauss-Newton fuer x(xi, eta) = point, fuer alle Kandidaten gleichzeitig
+        c = self.coords[self.connectivity[candidates]]                 # (m, 4, 3)
+        nat = np.zeros((candidates.size, 2))
+        for _ in range(max_iter):
+            N, dN = quadrature.shape_functions(nat)                     # (m, 4), (m, 4, 2)
+            residual = point - np.einsum('ma,mak->mk', N, c)
+            J = np.einsum('mak,mai->mki', c, dN)                        # (m, 3, 2)
+            step = np.einsum('mij,mj->mi', np.linalg.pinv(J), residual)
+            nat += step
+            if np.all(np.abs(step) < 1e-12):
+                break
+
+        N, _ = quadrature.shape_functions(nat)
+        distance = np.linalg.norm(point - np.einsum('ma,mak->mk', N, c), axis=1)
+        size = np.linalg.norm(c[:, 2] - c[:, 0], axis=1)
+        inside = np.all(np.abs(nat) <= 1.0 + tol, axis=1) & (distance <= tol * np.maximum(size, 1.0))
+        if not inside.any():
+            return None
+        k = np.flatnonzero(inside)[np.argmin(distance[inside])]
+        return int(candidates[k]), float(nat[k, 0]), float(nat[k, 1])
+
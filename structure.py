@@ -1,25 +1,470 @@
 # Class for structure
-from numpy.ma.extras import unique
-
 import element
 import forces
 import node
 import constraints
+import solvers
+import element_kernels
+import congruence
+import diagnostics
+import model_cache
+import failure
+import reordering
+import spatial
+
+import os
+import time
+import warnings
 
 import numpy as np
-import matplotlib.pyplot as plt
+import scipy.sparse as sp
+
+def _element_matrices_chunk(args):
+    # laeuft im Worker-Prozess: nur Arrays rein, (K_local, K_global) Bloecke raus
+    coords, abd_table, lam_index, refs, chunk_size, rules = args
+    return element_kernels.stiffness_matrices(coords, abd_table[lam_index], refs, chunk_size, rules)
+
 
 class Structure:
-    def __init__(self):
+    _dof_orderings = (None, 'rcm', 'nd')
+    # Reihenfolge der Schritte von solve_stages()
+    SOLVE_STAGES = ('elements', 'assembly', 'factorization', 'solve', 'strains')
+    # relatives Residuum |K u - F| / |F|, ab dem K als (numerisch) singulaer gilt
+    residual_tol = 1e-6
+
+    def __init__(self, dof_ordering: str = None):
         self._global_stiffness_matrix = None
         self._global_force_vector = None
         self.elements = []
         self._nodes = []
         self._unique_nodes = []
+        # Topologie als Arrays: Zeilen im NodeSet und (n_elem, 4) lokale Knotenindizes
+        self.node_store = None
+        self._node_index = None
+        self._connectivity = None
+        self._element_dofs = None
+        self.node_sets = {}
+        self.element_sets = {}
+        self._spatial_index = None
         self._displacements = None
+        self.solver = solvers.DirectSolver()
+        self.load_cases = {}
+        self.load_case_names = []
+        self.load_case_displacements = None
+        self.load_case_strains = None
+        self._element_stiffness_global = None
+        self._element_stiffness_local = None
+        self._csr_keys = None
+        # Zustand der letzten Berechnung, um Aenderungen an Knoten, Lagerungen und Laminaten zu erkennen
+        self._built_coords = None
+        self._built_rules = None
+        self._built_refs = None
+        self._built_free = None
+        self._laminates = []
+        self._lam_index = None
+        self._built_layup_keys = []
+        self._forced_dirty = np.array([], dtype=np.int64)
+        self.element_build_stats = None
+        # kongruente Elemente teilen Steifigkeitsmatrizen; None schaltet den Cache ab
+        self.stiffness_cache = congruence.default_cache
+        self.node_permutation = None
+        self.dof_permutation = None
+        # inkrementelles Loesen: Faktorisierung behalten, Aenderungen als Niedrigrang-Korrektur
+        self.max_update_rank = 0
+        self._low_rank_update = None
+        self._base_node_dofs = None
+        # Dehnungen an den Gausspunkten (n_elem, n_gp, 6), gueltig bis zur naechsten Loesung
+        self._strains_gp = None
+        self.set_dof_ordering(dof_ordering)
 
     def add_element(self, e:element.Element)->None:
             self.elements.append(e)
+            self._invalidate_topology()
+
+    def add_elements(self, elements: list, nodes: list = None, connectivity: np.ndarray = None)->None:
+        # viele Elemente auf einmal; mit nodes + connectivity (Indizes in nodes) entfaellt der Topologieaufbau
+        start = len(self.elements)
+        self.elements.extend(elements)
+        self._invalidate_topology()
+        if start > 0 or nodes is None or connectivity is None:
+            return
+
+        self._unique_nodes = list(nodes)
+        self.node_store = nodes[0]._store if nodes else node.Node.store
+        self._node_index = np.array([n._index for n in nodes], dtype=np.int64)
+        self._connectivity = np.asarray(connectivity, dtype=np.int64)
+
+    def add_node_set(self, name: str, node_ids: np.ndarray)->None:
+        # node_ids: Indizes in get_unique_nodes()
+        self.node_sets[name] = np.asarray(node_ids, dtype=np.int64)
+
+    def add_element_set(self, name: str, element_ids: np.ndarray)->None:
+        # element_ids: Indizes in self.elements
+        self.element_sets[name] = np.asarray(element_ids, dtype=np.int64)
+
+    def _node_rows(self, nodes)->np.ndarray:
+        # Name eines Knotensets oder Indizes in get_unique_nodes() -> Zeilen im NodeSet
+        self._list_nodes()
+        ids = self.node_sets[nodes] if isinstance(nodes, str) else np.asarray(nodes, dtype=np.int64)
+        return self._node_index[ids]
+
+    def set_constraints(self, nodes, constraint: constraints.Constraint)->None:
+        self.node_store.free[self._node_rows(nodes)] = constraint.get_constraints()
+
+    def set_forces(self, nodes, force: forces.Force)->None:
+        self.node_store.forces[self._node_rows(nodes)] = force.get_components()
+        self._global_force_vector = None
+
+    def spatial_index(self)->spatial.SpatialIndex:
+        if self._spatial_index is None:
+            self._spatial_index = spatial.SpatialIndex(self.node_coordinates(), self.get_connectivity())
+        return self._spatial_index
+
+    # Auswahlfunktionen liefern Indizes in get_unique_nodes(), passend fuer set_constraints/add_node_set
+    def select_box(self, lower, upper, tol: float = 1e-9)->np.ndarray:
+        return self.spatial_index().in_box(lower, upper, tol)
+
+    def select_plane(self, point, normal, tol: float = 1e-9)->np.ndarray:
+        return self.spatial_index().on_plane(point, normal, tol)
+
+    def select_sphere(self, center, radius: float, tol: float = 1e-9)->np.ndarray:
+        return self.spatial_index().in_sphere(center, radius, tol)
+
+    def nearest_node(self, point)->int:
+        return int(self.spatial_index().nearest(point)[1])
+
+    def locate_point(self, point, tol: float = 1e-6):
+        # (Elementindex, xi, eta) oder None
+        return self.spatial_index().locate(point, tol)
+
+    def probe_displacement(self, point, tol: float = 1e-6)->np.ndarray:
+        # Verschiebung (5,) an einem beliebigen Punkt auf der Schale, ueber die Formfunktionen interpoliert
+        found = self.locate_point(point, tol)
+        if found is None:
+            raise ValueError(f"Point {point} is not inside any element")
+        i, xi, eta = found
+        N, _, _ = element.Element._shape_function(xi, eta)
+        rows = self._node_index[self._connectivity[i]]
+        return N @ self.node_store.displacements[rows]
+
+    def merge_coincident_nodes(self, tol: float = 1e-9)->int:
+        # Knoten innerhalb tol zusammenfassen, Elemente umhaengen; liefert die Anzahl entfernter Knoten
+        self._list_nodes()
+        representative = self.spatial_index().coincident_groups(tol)
+        merged = np.flatnonzero(representative != np.arange(representative.size))
+        if merged.size == 0:
+            return 0
+
+        # Lasten addieren, ein DOF ist nur frei, wenn er an allen Duplikaten frei ist
+        store = self.node_store
+        rows, target_rows = self._node_index[merged], self._node_index[representative[merged]]
+        np.add.at(store.forces, target_rows, store.forces[rows])
+        np.logical_and.at(store.free, target_rows, store.free[rows])
+
+        old_rows = self._node_index
+        touched = np.flatnonzero(np.any(representative[self._connectivity] != self._connectivity, axis=1))
+        for i in touched:
+            e = self.elements[i]
+            e.nodes = [self._unique_nodes[k] for k in representative[self._connectivity[i]]]
+            e.node1, e.node2, e.node3, e.node4 = e.nodes
+            e.invalidate()
+
+        self._invalidate_topology()
+        self._list_nodes()
+
+        # Knotensets auf die neuen Indizes umschreiben
+        local = np.full(store.size, -1, dtype=np.int64)
+        local[self._node_index] = np.arange(self._node_index.size)
+        for name, ids in self.node_sets.items():
+            self.node_sets[name] = np.unique(local[old_rows[representative[ids]]])
+        return int(merged.size)
+
+    def set_dof_ordering(self, dof_ordering: str = None)->None:
+        # None: Einfuegereihenfolge, 'rcm': reverse Cuthill-McKee, 'nd': nested dissection
+        if dof_ordering not in self._dof_orderings:
+            raise ValueError(f"Unknown DOF ordering '{dof_ordering}', expected one of {self._dof_orderings}")
+        self.dof_ordering = dof_ordering
+        # mit eigener Umnummerierung soll SuperLU nicht nochmal umsortieren
+        if isinstance(self.solver, solvers.DirectSolver):
+            self.solver.permc_spec = 'COLAMD' if dof_ordering is None else 'NATURAL'
+        self.invalidate_stiffness()
+
+    def set_solver(self, solver)->None:
+        self.solver = solver
+        self._low_rank_update = None
+
+    def enable_incremental_updates(self, max_rank: int = 500)->None:
+        # lokale Steifigkeitsaenderungen und neu gesperrte DOFs ohne Refaktorisierung loesen,
+        # bis die Korrektur max_rank DOFs umfasst; 0 schaltet ab
+        self.max_update_rank = max_rank
+        if max_rank <= 0:
+            self._low_rank_update = None
+
+    def invalidate_stiffness(self)->None:
+        # verwirft globale Matrix und Faktorisierung, Elementmatrizen bleiben erhalten
+        self._global_stiffness_matrix = None
+        self._csr_keys = None
+        self.solver.reset()
+        self._low_rank_update = None
+
+    def _invalidate_topology(self)->None:
+        # Elemente/Knoten hinzugefuegt oder umgehaengt: auch die gebuendelten Elementarrays verwerfen
+        self._connectivity = None
+        self._spatial_index = None
+        self._element_stiffness_global = None
+        self._element_stiffness_local = None
+        self._strains_gp = None
+        self.invalidate_stiffness()
+
+    def invalidate_elements(self, element_ids)->None:
+        # explizit als veraendert markieren (z.B. anderes Laminat zugewiesen); wird beim naechsten Loesen nachgezogen
+        self._forced_dirty = np.union1d(self._forced_dirty, np.asarray(element_ids, dtype=np.int64))
+
+    def compute_element_matrices(self, chunk_size: int = 4096, workers: int = None)->None:
+        # alle Elementsteifigkeiten in einem Aufruf, Elemente werden Views darauf
+        # workers > 1: Bloecke von chunk_size Elementen auf einem Prozesspool rechnen
+        t_start = time.perf_counter()
+        coords = self.element_coordinates()
+        refs = self._reference_systems()
+        rules = self._quadrature_rules()
+
+        abd_table, lam_index = self._laminate_table()
+        n_elem = len(self.elements)
+        if workers == -1:
+            workers = os.cpu_count()
+        if workers is None or workers <= 1 or n_elem <= chunk_size:
+            workers = 1
+
+        def compute(ids):
+            return self._stiffness_matrices(coords[ids], abd_table, lam_index[ids], refs[ids],
+                                            rules if isinstance(rules, str) else rules[ids], chunk_size, workers)
+
+        if self.stiffness_cache is None:
+            K_local, K_global = compute(slice(None))
+        else:
+            K_local, K_global = self.stiffness_cache.stiffness_matrices(coords, refs, lam_index,
+                                                                        self._built_layup_keys, rules, compute)
+
+        for i, e in enumerate(self.elements):
+            e.bind_stiffness(K_local[i], K_global[i])
+        self._element_stiffness_global = K_global
+        self._element_stiffness_local = K_local
+        self._record_built_elements()
+        self._forced_dirty = np.array([], dtype=np.int64)
+        self.element_build_stats = {'elements': n_elem, 'workers': workers, 'chunk_size': chunk_size,
+                                    'seconds': time.perf_counter() - t_start}
+        if self.stiffness_cache is not None:
+            self.element_build_stats.update(cache_hits=self.stiffness_cache.hits,
+                                            cache_misses=self.stiffness_cache.misses)
+
+    @staticmethod
+    def _stiffness_matrices(coords, abd_table, lam_index, refs, rules, chunk_size, workers):
+        n_elem = coords.shape[0]
+        if workers <= 1 or n_elem <= chunk_size:
+            return element_kernels.stiffness_matrices(coords, abd_table[lam_index], refs, chunk_size, rules)
+
+        # erst hier importieren, Batch-Laeufe ohne Prozesspool starten schneller
+        from concurrent.futures import ProcessPoolExecutor
+
+        # gleiche Blockgrenzen wie seriell -> bitidentische Ergebnisse
+        K_local = np.empty((n_elem, 20, 20))
+        K_global = np.empty((n_elem, 20, 20))
+        starts = range(0, n_elem, chunk_size)
+        tasks = ((coords[i:i + chunk_size], abd_table, lam_index[i:i + chunk_size], refs[i:i + chunk_size],
+                  chunk_size, rules if isinstance(rules, str) else rules[i:i + chunk_size]) for i in starts)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for i, (Kl, Kg) in zip(starts, pool.map(_element_matrices_chunk, tasks)):
+                K_local[i:i + chunk_size] = Kl
+                K_global[i:i + chunk_size] = Kg
+        return K_local, K_global
+
+    def _record_built_elements(self)->None:
+        # Stand der Elementmatrizen: Knotenkoordinaten, Integrationsregel und Referenzsystem je Element
+        self._built_coords = self.node_coordinates().copy()
+        self._built_rules = np.array([e.quadrature for e in self.elements])
+        self._built_refs = self._reference_systems()
+
+    def _reference_systems(self)->np.ndarray:
+        return np.array([e.reference_system for e in self.elements], dtype=float).reshape(-1, 3)
+
+    def _quadrature_rules(self):
+        # ein Regelname, wenn alle Elemente gleich integriert werden, sonst (n_elem,) Array
+        rules = {e.quadrature for e in self.elements}
+        if len(rules) == 1:
+            return rules.pop()
+        return np.array([e.quadrature for e in self.elements])
+
+    def _strain_rule(self)->str:
+        # Dehnungen brauchen gleich viele Gausspunkte je Element
+        rules = self._quadrature_rules()
+        return rules if isinstance(rules, str) else '2x2'
+
+    def _laminate_table(self):
+        # ABD nur einmal pro Laminat berechnen; liefert (n_lam, 6, 6) Tabelle und Index je Element
+        laminates = {}
+        lam_index = np.empty(len(self.elements), dtype=int)
+        for i, e in enumerate(self.elements):
+            lam_index[i] = laminates.setdefault(id(e.laminate), (len(laminates), e.laminate))[0]
+        self._laminates = [lam for _, lam in laminates.values()]
+        self._lam_index = lam_index
+        abd_table = []
+        for lam in self._laminates:
+            lam.calc_ABD_matrices()
+            abd_table.append(lam.ABDij)
+        self._built_layup_keys = [lam.layup_key() for lam in self._laminates]
+        return np.array(abd_table).reshape(-1, 6, 6), lam_index
+
+    def _detect_changes(self):
+        # liefert (veraenderte Elemente, Lagerungen geaendert) seit der letzten Berechnung
+        coords = self.node_coordinates()
+        moved = np.any(coords != self._built_coords, axis=1)
+        changed_laminates = np.array([lam.layup_key() != key
+                                      for lam, key in zip(self._laminates, self._built_layup_keys)], dtype=bool)
+
+        dirty = moved[self._connectivity].any(axis=1)
+        # Integrationsregel und Referenzsystem sind je Element aenderbar
+        dirty |= np.array([e.quadrature for e in self.elements]) != self._built_rules
+        dirty |= np.any(self._reference_systems() != self._built_refs, axis=1)
+        if changed_laminates.any():
+            dirty |= changed_laminates[self._lam_index]
+        dirty = np.union1d(np.flatnonzero(dirty), self._forced_dirty)
+
+        constraints_changed = (self._built_free is not None
+                               and not np.array_equal(self.node_store.free[self._node_index], self._built_free))
+        return dirty, constraints_changed
+
+    def _recompute_elements(self, dirty: np.ndarray)->np.ndarray:
+        # Steifigkeit nur fuer dirty neu rechnen, in die vorhandenen Arrays; liefert K_neu - K_alt
+        abd_table, lam_index = self._laminate_table()
+        refs = np.array([self.elements[i].reference_system for i in dirty], dtype=float).reshape(-1, 3)
+        rules = self._quadrature_rules()
+        rules = rules if isinstance(rules, str) else rules[dirty]
+        coords = self.element_coordinates()[dirty]
+
+        def compute(ids):
+            return element_kernels.stiffness_matrices(coords[ids], abd_table[lam_index[dirty][ids]], refs[ids],
+                                                      rule=rules if isinstance(rules, str) else rules[ids])
+
+        if self.stiffness_cache is None:
+            K_local, K_global = compute(slice(None))
+        else:
+            K_local, K_global = self.stiffness_cache.stiffness_matrices(coords, refs, lam_index[dirty],
+                                                                        self._built_layup_keys, rules, compute)
+
+        delta = K_global - self._element_stiffness_global[dirty]
+        self._element_stiffness_local[dirty] = K_local
+        self._element_stiffness_global[dirty] = K_global
+        for i in dirty:
+            self.elements[i].invalidate()
+            self.elements[i].bind_stiffness(self._element_stiffness_local[i], self._element_stiffness_global[i])
+        self._record_built_elements()
+        self._forced_dirty = np.array([], dtype=np.int64)
+        self._spatial_index = None
+        self._strains_gp = None
+        return delta
+
+    def _add_to_global(self, element_ids: np.ndarray, blocks: np.ndarray)->None:
+        # (m, 20, 20) Bloecke an die vorhandenen Eintraege von K addieren, Muster bleibt gleich
+        dofs = self._element_dofs[element_ids]
+        rows = np.repeat(dofs, 20, axis=1)
+        cols = np.tile(dofs, (1, 20))
+        mask = (rows != -1) & (cols != -1)
+        values = blocks.reshape(-1, 400)[mask]
+        K = self._global_stiffness_matrix
+
+        if not sp.issparse(K):
+            np.add.at(K, (rows[mask], cols[mask]), values)
+            return
+        if self._csr_keys is None:
+            # Eintraege der kanonischen CSR-Matrix sind nach (Zeile, Spalte) sortiert
+            row_of_entry = np.repeat(np.arange(K.shape[0], dtype=np.int64), np.diff(K.indptr))
+            self._csr_keys = row_of_entry * K.shape[1] + K.indices
+        positions = np.searchsorted(self._csr_keys, rows[mask] * K.shape[1] + cols[mask])
+        np.add.at(K.data, positions, values)
+
+    def update_stiffness(self)->np.ndarray:
+        """Bring element matrices and K up to date after model changes.
+
+        Moved nodes, changed laminates and invalidate_elements() mark elements
+        dirty; only those are recomputed and their difference is added into
+        the existing global matrix. Changed constraints renumber the DOFs and
+        re-assemble K from the cached element matrices. Returns the indices of
+        the recomputed elements.
+        """
+        if self._element_stiffness_global is None or self._connectivity is None:
+            return np.array([], dtype=np.int64)
+
+        dirty, constraints_changed = self._detect_changes()
+        delta = self._recompute_elements(dirty) if dirty.size else None
+        if (dirty.size or constraints_changed) and self._update_incrementally(dirty, delta, constraints_changed):
+            return dirty
+
+        if constraints_changed:
+            # neue DOF-Nummerierung: K und Lastvektor neu assemblieren
+            self.invalidate_stiffness()
+            self._global_force_vector = None
+        elif dirty.size:
+            if self._global_stiffness_matrix is not None:
+                self._add_to_global(dirty, delta)
+            self.solver.reset()
+            self._low_rank_update = None
+        return dirty
+
+    def _update_incrementally(self, dirty: np.ndarray, delta: np.ndarray, constraints_changed: bool)->bool:
+        # Aenderung an die vorhandene Faktorisierung anhaengen; False -> normal neu faktorisieren
+        update = self._low_rank_update
+        if update is None or not self.solver.is_factorized():
+            return False
+        base_dofs = self._base_node_dofs
+        free = self.node_store.free[self._node_index]
+        if constraints_changed and np.any(free & (base_dofs == -1)):
+            # freigegebene DOFs fehlen in der alten Faktorisierung
+            return False
+        if dirty.size:
+            update.add_stiffness(base_dofs[self._connectivity[dirty]].reshape(-1, 20), delta)
+        if constraints_changed:
+            # Sperrsatz jedes Mal aus der aktuellen Lagerung, nicht nur erweitern
+            update.set_locked(base_dofs[~free & (base_dofs != -1)])
+        if update.rank() > self.max_update_rank:
+            return False
+
+        if constraints_changed:
+            # K in neuer Nummerierung wird erst bei der naechsten Refaktorisierung assembliert
+            self._enumerate_dofs()
+            self._global_stiffness_matrix = None
+            self._csr_keys = None
+            self._global_force_vector = None
+        elif self._global_stiffness_matrix is not None:
+            self._add_to_global(dirty, delta)
+        return True
+
+    def benchmark_element_build(self, workers: int = -1, chunk_size: int = 4096)->dict:
+        # seriell gegen parallel, prueft Bitgleichheit und gibt den Speedup aus; ohne Kongruenz-Cache
+        cache, self.stiffness_cache = self.stiffness_cache, None
+        try:
+            self.compute_element_matrices(chunk_size)
+            serial = self.element_build_stats['seconds']
+            K_serial = self._element_stiffness_global.copy()
+
+            self.compute_element_matrices(chunk_size, workers)
+        finally:
+            self.stiffness_cache = cache
+        stats = dict(self.element_build_stats)
+        stats['serial_seconds'] = serial
+        stats['speedup'] = serial / stats['seconds']
+        stats['identical'] = bool(np.array_equal(K_serial, self._element_stiffness_global))
+        print(f"Element build: {stats['elements']} elements, serial {serial:.3f} s, "
+              f"{stats['workers']} workers {stats['seconds']:.3f} s, speedup {stats['speedup']:.2f}x, "
+              f"bit-identical: {stats['identical']}")
+        return stats
+
+    def save_state(self, path: str, factors: bool = False)->None:
+        # assemblierten Zustand (Knoten, DOFs, Elementmatrizen, K, F, u, optional Faktoren) als NPZ speichern
+        model_cache.save(self, path, factors)
+
+    def load_state(self, path: str, mmap: bool = True)->bool:
+        # False, wenn die Datei fehlt oder zu einem anderen Modell gehoert; dann normal rechnen
+        return model_cache.load(self, path, mmap)
 
     def print_structure(self)->None:
         for i in self.elements:
@@ -30,24 +475,111 @@ class Structure:
         return self._unique_nodes
 
     def _list_nodes(self) -> None:
+        if self._connectivity is not None:
+            return
         self._nodes = []
         for el in self.elements:
             # Unterstützt jetzt beliebig viele Knoten pro Element
             self._nodes.extend(el.nodes)
-        self._unique_nodes = list(dict.fromkeys(self._nodes))
+
+        stores = {id(n._store): n._store for n in self._nodes}
+        if len(stores) > 1:
+            raise ValueError("All nodes of a structure must belong to the same NodeSet")
+        self.node_store = next(iter(stores.values()), node.Node.store)
+
+        # eindeutige Knoten in Reihenfolge des ersten Auftretens
+        rows = np.array([n._index for n in self._nodes], dtype=np.int64)
+        unique_rows, first = np.unique(rows, return_index=True)
+        order = np.argsort(first)
+        self._node_index = unique_rows[order]
+        self._unique_nodes = [self._nodes[i] for i in first[order]]
+
+        local = np.empty(self.node_store.size, dtype=np.int64)
+        local[self._node_index] = np.arange(self._node_index.size)
+        self._connectivity = local[rows].reshape(len(self.elements), -1)
+
+    def get_connectivity(self)->np.ndarray:
+        # (n_elem, 4) Indizes in get_unique_nodes()
+        self._list_nodes()
+        return self._connectivity
+
+    def node_coordinates(self)->np.ndarray:
+        self._list_nodes()
+        return self.node_store.coords[self._node_index]
+
+    def nodal_displacements(self)->np.ndarray:
+        # (n_nodes, 5) wie get_unique_nodes(); View ohne Kopie, wenn die Knoten im NodeSet am Stueck liegen
+        self._list_nodes()
+        rows = self._node_index
+        if rows.size and rows[-1] - rows[0] == rows.size - 1 and np.all(np.diff(rows) == 1):
+            return self.node_store.displacements[rows[0]:rows[-1] + 1]
+        return self.node_store.displacements[rows]
+
+    def element_coordinates(self)->np.ndarray:
+        # (n_elem, 4, 3)
+        self._list_nodes()
+        return self.node_store.coords[self._node_index[self._connectivity]]
+
+    def node_dofs(self)->np.ndarray:
+        # (n_nodes, 5) globale DOF-Nummern, -1 = gesperrt
+        return self.node_store.dofs[self._node_index]
 
     def _enumerate_dofs(self)->None:
         self._list_nodes()
-        self._numberofdofs = 0
-        for n in self._unique_nodes:
-            self._numberofdofs = n.enumerateDOFs(self._numberofdofs)
+        self.node_permutation = self._node_ordering()
+
+        rows = self._node_index[self.node_permutation]
+        free = self.node_store.free[rows]
+        self._built_free = self.node_store.free[self._node_index].copy()
+        numbers = np.cumsum(free.ravel()).reshape(free.shape) - 1
+        self.node_store.dofs[rows] = np.where(free, numbers, -1)
+        self._numberofdofs = int(free.sum())
+
+        # dof_permutation[k]: neue DOF-Nummer des k-ten DOFs in Einfuegereihenfolge
+        node_dofs = self.node_dofs()
+        self.dof_permutation = node_dofs[node_dofs != -1]
+
+        self._element_dofs = node_dofs[self._connectivity].reshape(len(self.elements), -1)
+        for i, e in enumerate(self.elements):
+            e._dofNumbers = self._element_dofs[i]
+
+    def _node_ordering(self)->np.ndarray:
+        n_nodes = len(self._unique_nodes)
+        if self.dof_ordering is None or n_nodes == 0:
+            return np.arange(n_nodes)
 
-    def assemble_global_stiffness_matrix(self)->None:
+        adjacency = reordering.node_adjacency(self._connectivity, n_nodes)
+
+        if self.dof_ordering == 'rcm':
+            return reordering.rcm(adjacency)
+        return reordering.nested_dissection(adjacency, self.node_coordinates())
+
+    def to_original_dof_order(self, values: np.ndarray)->np.ndarray:
+        # Vektor (ndof, ...) in umnummerierter Reihenfolge -> Reihenfolge ohne Umnummerierung
+        return np.asarray(values)[self.dof_permutation]
+
+    def _prepare_elements(self)->None:
+        # DOFs nummerieren und fehlende Elementmatrizen berechnen
         self._enumerate_dofs()
+        self.invalidate_stiffness()
+        if self._element_stiffness_global is None:
+            self.compute_element_matrices()
+
+    def _element_stiffness_array(self)->np.ndarray:
+        if self._element_stiffness_global is None:
+            self.compute_element_matrices()
+        return self._element_stiffness_global
+
+    def assemble_global_stiffness_matrix(self, sparse: bool = True)->None:
+        self._prepare_elements()
+
+        if sparse:
+            self._global_stiffness_matrix = self._assemble_sparse()
+            return
+
         self._global_stiffness_matrix = np.zeros((self._numberofdofs, self._numberofdofs))
 
         for e in self.elements:
-            e.enumerate_dofs()
             for i_local, I in enumerate(e._dofNumbers):
                 if I == -1:
                     continue
@@ -56,48 +588,248 @@ class Structure:
                         continue
                     self._global_stiffness_matrix[I, J] += e.stiffness_matrix_global[i_local, j_local]
 
-        fig, ax = plt.subplots()
-        ax.imshow((self._global_stiffness_matrix != 0).astype(int), cmap='gray')
-        ax.set_title(f"Global stiffness matrix Element")
-        plt.show()
+    def _assemble_sparse(self) -> sp.csr_matrix:
+        # COO-Tripel aller Elemente auf einmal aufbauen, Duplikate summiert tocsr()
+        n_dof_el = 20
+        blocks = self._element_stiffness_array().reshape(-1, n_dof_el * n_dof_el)
+        dofs = self._element_dofs
+
+        rows = np.repeat(dofs, n_dof_el, axis=1)
+        cols = np.tile(dofs, (1, n_dof_el))
+        mask = (rows != -1) & (cols != -1)
 
-        if np.isclose(np.linalg.det(self._global_stiffness_matrix), 0.0):
-            missing_constraint = np.where(~self._global_stiffness_matrix.any(axis=1))[0]
+        K = sp.coo_matrix((blocks[mask], (rows[mask], cols[mask])),
+                          shape=(self._numberofdofs, self._numberofdofs))
+        return K.tocsr()
+
+    def check_singularity(self, rel_tol: float = 1e-10)->list:
+        # meldet Knoten/DOFs, die noch gesperrt werden muessen; [] wenn K regulaer ist
+        if self._global_stiffness_matrix is None:
+            self.assemble_global_stiffness_matrix()
+        missing_constraint = diagnostics.find_singular_dofs(self._global_stiffness_matrix, rel_tol)
+        node_ids = np.array([n.id for n in self._unique_nodes])
+        located = diagnostics.locate_dofs(node_ids, self.node_dofs(), missing_constraint)
+        if missing_constraint.size:
             print(missing_constraint)
-            for n in self._unique_nodes:
-                if any(np.isin(n.getDOFNumbers(), missing_constraint)):
-                    print(f'Node ID: {n.id}, DOF to lock: {np.where(np.isin(n.getDOFNumbers(), missing_constraint))[0]}')
+        for node_id, local_dofs in located:
+            print(f'Node ID: {node_id}, DOF to lock: {local_dofs}')
+        return located
+
+    def plot_sparsity(self, ax=None, show: bool = True):
+        if self._global_stiffness_matrix is None:
+            self.assemble_global_stiffness_matrix()
+        return diagnostics.plot_sparsity(self._global_stiffness_matrix, ax=ax, show=show)
 
     def assemble_forces_matrix(self)->None:
 
         self._global_force_vector = np.zeros(self._numberofdofs)
 
-        for n in self._unique_nodes:
-            for i_local, dof_num in enumerate(n._dofNumbers):
-                if dof_num != -1:
-                    self._global_force_vector[dof_num] += n.force.get_components()[i_local]
-        print(self._global_force_vector)
+        node_dofs = self.node_dofs()
+        free = node_dofs != -1
+        self._global_force_vector[node_dofs[free]] = self.node_store.forces[self._node_index][free]
 
     def solve(self)->None:
-        if self._global_stiffness_matrix is None:
-            self.assemble_global_stiffness_matrix()
+        self._factorize()
+        self._solve_factorized()
+
+    def _solve_factorized(self)->None:
         if self._global_force_vector is None:
             self.assemble_forces_matrix()
 
         self._displacements = None
-        self._displacements = np.linalg.solve(self._global_stiffness_matrix, self._global_force_vector)
+        self._displacements = self._solve_system(self._global_force_vector, warm_start=True)
+        self._check_residual(self._global_force_vector, self._displacements)
         self._set_nodal_displacements()
 
+    def _check_residual(self, F: np.ndarray, U: np.ndarray)->None:
+        # fast singulaeres K faktorisiert ohne Fehler, liefert aber riesige Verschiebungen; eine SpMV pro Loesung
+        K = self._global_stiffness_matrix
+        if K is None or self._matrix_free() or K.shape[0] != F.shape[0]:
+            return
+        F = F.reshape(F.shape[0], -1)
+        U = U.reshape(F.shape)
+        scale = np.maximum(np.linalg.norm(F, axis=0), np.finfo(float).tiny)
+        residual = np.max(np.linalg.norm(K @ U - F, axis=0) / scale)
+        if residual > self.residual_tol:
+            located = self.check_singularity()
+            warnings.warn(f"Stiffness matrix is numerically singular: relative residual {residual:.3g}, "
+                          f"{len(located)} nodes need further constraints (see check_singularity())")
+
+    def solve_stages(self):
+        """solve() split into the SOLVE_STAGES, ending with strain recovery.
+
+        Yields the name of each stage before running it, so a caller (e.g. a
+        worker thread) can report progress and stop between stages by closing
+        the generator. Finished stages stay valid: element matrices, K and the
+        factorization are reused by the next solve.
+        """
+        yield 'elements'
+        if self._element_stiffness_global is None:
+            self.compute_element_matrices()
+        else:
+            self.update_stiffness()
+
+        yield 'assembly'
+        if not self._matrix_free() and not self.solver.is_factorized() and self._global_stiffness_matrix is None:
+            self.assemble_global_stiffness_matrix()
+
+        yield 'factorization'
+        self._factorize()
+
+        yield 'solve'
+        self._solve_factorized()
+
+        yield 'strains'
+        self.recover_strains('gauss')
+
+    def _matrix_free(self)->bool:
+        return getattr(self.solver, 'matrix_free', False)
+
+    def _solve_system(self, F: np.ndarray, warm_start: bool = False)->np.ndarray:
+        update = self._low_rank_update
+        if update is not None and update.has_updates():
+            # rechte Seite in die Nummerierung der Faktorisierung umrechnen und zurueck
+            node_dofs, base_dofs = self.node_dofs(), self._base_node_dofs
+            free = node_dofs != -1
+            F_base = np.zeros((update.ndof,) + F.shape[1:])
+            F_base[base_dofs[free]] = F[node_dofs[free]]
+            U_base = update.solve(F_base)
+            U = np.zeros_like(F, dtype=float)
+            U[node_dofs[free]] = U_base[base_dofs[free]]
+            return U
+
+        if warm_start and self._matrix_free():
+            # iterativ: mit den letzten Knotenverschiebungen starten, auch nach Umnummerierung
+            node_dofs = self.node_dofs()
+            free = node_dofs != -1
+            x0 = np.zeros(self._numberofdofs)
+            x0[node_dofs[free]] = self.node_store.displacements[self._node_index][free]
+            return self.solver.solve(F, x0=x0)
+        return self.solver.solve(F)
+
+    def _factorize(self)->None:
+        # direkt: K assemblieren und faktorisieren, matrixfrei: nur Elementarrays uebergeben
+        self.update_stiffness()
+        if self.solver.is_factorized():
+            return
+        if self._matrix_free():
+            self._prepare_elements()
+            self.solver.setup(self._element_stiffness_array(), self._element_dofs,
+                              self._numberofdofs, self.node_dofs())
+            return
+
+        if self._global_stiffness_matrix is None:
+            self.assemble_global_stiffness_matrix()
+        try:
+            self.solver.factorize(self._global_stiffness_matrix)
+        except RuntimeError:
+            # singulaer: fehlende Lagerungen ausgeben
+            self.check_singularity()
+            raise
+        if self.max_update_rank > 0:
+            self._low_rank_update = solvers.LowRankUpdate(self.solver, self._numberofdofs)
+            self._base_node_dofs = self.node_dofs().copy()
+
+    def add_load_case(self, name: str, nodal_forces: dict)->None:
+        # nodal_forces: {Node: forces.Force oder [fx, fy, fz, mx, my]}
+        self.load_cases[name] = {
+            n: np.asarray(f.get_components() if isinstance(f, forces.Force) else f, dtype=float)
+            for n, f in nodal_forces.items()
+        }
+
+    def remove_load_case(self, name: str)->None:
+        del self.load_cases[name]
+
+    def assemble_load_case_matrix(self)->np.ndarray:
+        # (ndof x ncases) rechte Seite, Spalten in Reihenfolge von load_case_names
+        self.load_case_names = list(self.load_cases)
+        F = np.zeros((self._numberofdofs, len(self.load_case_names)))
+
+        for k, name in enumerate(self.load_case_names):
+            for n, components in self.load_cases[name].items():
+                dofs = n.getDOFNumbers()
+                free = dofs != -1
+                F[dofs[free], k] += components[free]
+        return F
+
+    def solve_load_cases(self)->None:
+        if not self.load_cases:
+            raise ValueError("No load cases registered, use add_load_case() first")
+        self._factorize()
+
+        F = self.assemble_load_case_matrix()
+        U = self._solve_system(F).reshape(self._numberofdofs, -1)
+        self._check_residual(F, U)
+        # fester Freiheitsgrad (-1) liest die angehaengte Nullzeile
+        U = np.vstack([U, np.zeros((1, U.shape[1]))])
+
+        node_dofs = self.node_dofs()
+        # (ncases, nnodes, 5), Knoten in Reihenfolge von get_unique_nodes()
+        self.load_case_displacements = np.moveaxis(U[node_dofs], -1, 0)
+
+        # (ncases, nelements, 5), ueber die Gausspunkte gemittelt
+        eps = element_kernels.strains(self.element_coordinates(), self._reference_systems(),
+                                      U[self._element_dofs], rule=self._strain_rule())
+        self.load_case_strains = np.moveaxis(eps[:, :, :5].mean(axis=1), -1, 0)
+
+    def get_load_case_displacements(self, name: str)->np.ndarray:
+        return self.load_case_displacements[self.load_case_names.index(name)]
+
+    def get_load_case_strains(self, name: str)->np.ndarray:
+        return self.load_case_strains[self.load_case_names.index(name)]
+
+    def recover_strains(self, output: str = 'gauss')->np.ndarray:
+        """Strains and curvatures [eps_x, eps_y, gamma_xy, kappa_x, kappa_y, kappa_xy].
+
+        output='gauss': (n_elem, n_gp, 6) at the Gauss points,
+        'element': (n_elem, 6) averaged per element,
+        'nodal': (n_nodes, 6) extrapolated to the corners and averaged over
+        the elements sharing a node, nodes as in get_unique_nodes().
+        Computed in one pass from the nodal displacements and cached until
+        the next solve.
+        """
+        if self._strains_gp is None:
+            self._strains_gp = self.gauss_strains(self.node_store.displacements[self._node_index])
+            self._strains_gp.flags.writeable = False
+
+        if output == 'gauss':
+            return self._strains_gp
+        if output == 'element':
+            return self._strains_gp.mean(axis=1)
+        if output == 'nodal':
+            return self.strains_to_nodes(self._strains_gp)
+        raise ValueError(f"Unknown strain output '{output}', expected 'gauss', 'element' or 'nodal'")
+
+    def gauss_strains(self, displacements: np.ndarray)->np.ndarray:
+        # (n_nodes, 5) Knotenverschiebungen, z.B. eines Lastfalls -> (n_elem, n_gp, 6), ohne Cache
+        conn = self.get_connectivity()
+        u_elem = np.asarray(displacements)[conn].reshape(len(self.elements), 20)
+        return element_kernels.strains(self.element_coordinates(), self._reference_systems(), u_elem,
+                                       rule=self._strain_rule())
+
+    def strains_to_nodes(self, strains_gp: np.ndarray)->np.ndarray:
+        # Gausspunktwerte an die Ecken extrapolieren und je Knoten mitteln -> (n_nodes, 6)
+        corners = np.einsum('ag,ngk->nak', element_kernels.gauss_to_nodes(self._strain_rule()), strains_gp)
+        conn = self._connectivity.ravel()
+        n_nodes = len(self._unique_nodes)
+        count = np.bincount(conn, minlength=n_nodes)
+        nodal = np.stack([np.bincount(conn, weights=corners[..., k].ravel(), minlength=n_nodes)
+                          for k in range(6)], axis=1)
+        return nodal / np.maximum(count, 1)[:, None]
+
+    def evaluate_failure(self, criterion: str = 'tsai_wu', chunk_size: int = 4096)->failure.FailureResult:
+        # 'tsai_wu', 'hashin' oder 'puck' ueber alle Gausspunkte, Lagen und Lagenseiten; kritische Lage je Element
+        strains = self.recover_strains('gauss')
+        self._laminate_table()
+        return failure.evaluate(strains, self._laminates, self._lam_index, criterion, chunk_size)
+
     def _set_nodal_displacements(self)->None:
-        for n in self._unique_nodes:
-            x = n.getDOFNumbers()
-            for i_local, dof_num in enumerate(n.getDOFNumbers()):
-                if dof_num == -1:
-                    n.set_displacement(i_local, 0)
-                else:
-                    u = self._displacements[dof_num]
-                    n.set_displacement(i_local, u)
-            n.calculate_new_position()
+        # gesperrte DOFs (-1) lesen die angehaengte Null
+        u = np.append(self._displacements, 0.0)[self.node_dofs()]
+        store = self.node_store
+        store.displacements[self._node_index] = u
+        store.displaced[self._node_index] = store.coords[self._node_index] + u[:, 0:3] * node.DISPLACEMENT_SCALE
+        self._strains_gp = None
 
 def main():
     # main for testing
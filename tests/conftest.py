@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Module liegen flach im Repository-Wurzelverzeichnis
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
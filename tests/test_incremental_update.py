@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+
+import constraints
+import forces
+import Laminate as lc
+import Material
+import mesh
+import node
+import Plies
+
+MATERIAL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'MaterialData')
+
+
+def _plate(n: int = 8):
+    T300 = Material.PropertiesComposite.from_yaml(os.path.join(MATERIAL_DIR, 'T300.yaml'))
+    lam = lc.Laminate(entries=[Plies.Ply(material=T300, thickness=0.25e-3, rotation_angle=np.deg2rad(a))
+                               for a in (0.0, 45.0, -45.0, 90.0)])
+    s = mesh.build_structure(mesh.rectangular_plate(1.0, 1.0, n, n), lam, np.array([1.0, 0.0, 0.0]),
+                             store=node.NodeSet())
+    s.set_constraints('all', constraints.Constraint(True, True, False, True, True))
+    s.set_constraints('x0', constraints.Constraint(False, False, False, False, False))
+    s.set_forces('x1', forces.Force(1000.0, 200.0, 0.0, 0.0, 0.0))
+    return s
+
+
+def _solve(s):
+    s.solve()
+    return s.nodal_displacements().copy()
+
+
+def test_released_dofs_match_fresh_solve():
+    interior = [20, 21, 22]
+    s = _plate()
+    s.enable_incremental_updates(500)
+    _solve(s)
+
+    s.set_constraints(interior, constraints.Constraint(False, False, False, False, False))
+    locked = _solve(s)
+    assert s._low_rank_update is not None and s._low_rank_update.has_updates()
+    assert np.all(locked[interior] == 0.0)
+
+    # wieder freigeben: Ergebnis muss der ungesperrten Loesung entsprechen
+    s.set_constraints(interior, constraints.Constraint(True, True, False, True, True))
+    released = _solve(s)
+
+    fresh = _solve(_plate())
+    assert not np.allclose(released, locked)
+    np.testing.assert_allclose(released, fresh, rtol=1e-8, atol=1e-10 * np.abs(fresh).max())
+
+
+def _set_quadrature(s, rule: str):
+    for e in s.elements:
+        e.quadrature = rule
+    return s
+
+
+def test_changed_quadrature_recomputes_elements():
+    s = _plate()
+    before = _solve(s)
+    changed = _solve(_set_quadrature(s, 'selective'))
+
+    fresh = _solve(_set_quadrature(_plate(), 'selective'))
+    assert not np.allclose(fresh, before)
+    np.testing.assert_allclose(changed, fresh, rtol=1e-8, atol=1e-10 * np.abs(fresh).max())